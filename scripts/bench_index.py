@@ -0,0 +1,154 @@
+"""
+Benchmark how operator excel lookups scale with the number of operators,
+per-operator table scans before `GameDataIndex` against the index
+
+    python scripts/bench_index.py [--sizes 250 500 1000 2000] [--repeat 3]
+
+Tables are generated into a temporary directory, each operator with
+`--voices` voice rows and `--uniequips` uniequip rows. Both sides read
+the tables from it, so loading is included in the timings.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from terra_bystander.gamedata import GameDataIndex, open_storage
+
+
+def write_tables(path: Path, operators: int, voices: int, uniequips: int) -> None:
+    """
+    Write `charword_table` and `uniequip_table` of generated operators
+
+    :params path: gamedata directory
+    :params operators: number of operators
+    :params voices: voice rows per operator
+    :params uniequips: uniequip rows per operator
+    """
+    char_words: dict[str, Any] = {}
+    equip_dict: dict[str, Any] = {}
+    for i in range(operators):
+        char_id = f"char_{i:05d}"
+        for j in range(voices):
+            char_words[f"{char_id}_CN_{j:03d}"] = {
+                "charId": char_id,
+                "voiceIndex": j,
+                "voiceTitle": f"title {j}",
+                "voiceText": f"voice {i} {j}",
+            }
+        for j in range(uniequips):
+            equip_dict[f"uniequip_{i:05d}_{j}"] = {
+                "charId": char_id,
+                "charEquipOrder": j,
+                "uniEquipId": f"uniequip_{i:05d}_{j}",
+                "typeName1": "EQ",
+                "typeName2": None,
+                "uniEquipName": f"equip {i} {j}",
+                "uniEquipDesc": f"desc {i} {j}",
+            }
+
+    (path / "excel").mkdir(parents=True, exist_ok=True)
+    for filename, data in (
+        ("charword_table", {"charWords": char_words}),
+        ("uniequip_table", {"equipDict": equip_dict, "subProfDict": {}}),
+    ):
+        with (path / "excel" / f"{filename}.json").open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def scan_lookups(path: Path, operator_ids: list[str]) -> int:
+    """
+    Look up rows of each operator by scanning the tables, like `Reader`
+    before `GameDataIndex`
+
+    :params path: gamedata directory
+    :params operator_ids: operators to look up
+
+    :return: number of rows found
+    """
+    storage = open_storage(path)
+    char_words = json.loads(storage.read_bytes("excel/charword_table.json"))[
+        "charWords"
+    ]
+    equip_dict = json.loads(storage.read_bytes("excel/uniequip_table.json"))[
+        "equipDict"
+    ]
+
+    count = 0
+    for operator_id in operator_ids:
+        voices: dict[int, Any] = {}
+        for data in char_words.values():
+            if data["charId"] == operator_id:
+                voices[data["voiceIndex"]] = data
+        uniequips: dict[int, Any] = {}
+        for data in equip_dict.values():
+            if data["charId"] == operator_id:
+                uniequips[data["charEquipOrder"]] = data
+        count += len([voices[i] for i in sorted(voices)])
+        count += len([uniequips[i] for i in sorted(uniequips)])
+    return count
+
+
+def index_lookups(path: Path, operator_ids: list[str]) -> int:
+    """
+    Look up rows of each operator with `GameDataIndex`
+
+    :params path: gamedata directory
+    :params operator_ids: operators to look up
+
+    :return: number of rows found
+    """
+    index = GameDataIndex(open_storage(path))
+    count = 0
+    for operator_id in operator_ids:
+        count += len(index.voices(operator_id))
+        count += len(index.uniequips(operator_id))
+    return count
+
+
+def best_time(fn: Callable[[], int], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark scaling of operator excel lookups"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--voices", type=int, default=10)
+    parser.add_argument("--uniequips", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'operators':>9} {'scan':>9} {'index':>9} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            write_tables(path, size, args.voices, args.uniequips)
+            operator_ids = [f"char_{i:05d}" for i in range(size)]
+
+            scan_seconds, scan_count = best_time(
+                lambda: scan_lookups(path, operator_ids), args.repeat
+            )
+            index_seconds, index_count = best_time(
+                lambda: index_lookups(path, operator_ids), args.repeat
+            )
+            assert scan_count == index_count == size * (args.voices + args.uniequips)
+        print(
+            f"{size:>9} {scan_seconds:>8.3f}s {index_seconds:>8.3f}s "
+            f"{scan_seconds / index_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
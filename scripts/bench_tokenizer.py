@@ -0,0 +1,83 @@
+"""
+Benchmark tokens per second of the regex scanner and the reference state
+machine on story lines of a gamedata tree
+
+    python scripts/bench_tokenizer.py path_to_gamedata [--repeat 3]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from terra_bystander.gamedata import open_storage
+from terra_bystander.script import Tokenizer
+
+
+def load_lines(path: Path) -> list[str]:
+    """
+    Read code lines of all story files
+
+    :params path: gamedata directory, archive or pack
+
+    :return: code lines in file name order
+    """
+    storage = open_storage(path)
+    lines: list[str] = []
+    for name in sorted(storage.names()):
+        if name.startswith("story/") and name.endswith(".txt"):
+            lines += [
+                line.text
+                for line in Tokenizer.iter_code_lines(storage.read_bytes(name))
+            ]
+    return lines
+
+
+def tokenize_all(lines: list[str], reference: bool) -> int:
+    """
+    Tokenize lines, skipping lines with syntax errors
+
+    :params lines: code lines
+    :params reference: use the reference state machine
+
+    :return: number of tokens
+    """
+    count = 0
+    for line in lines:
+        try:
+            count += len(Tokenizer.tokenize(line, reference=reference))
+        except SyntaxError:
+            pass
+    return count
+
+
+def best_time(fn: Callable[[], int], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the tokenizer engines on story lines"
+    )
+    parser.add_argument("gamedata_path", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = load_lines(args.gamedata_path)
+    print(f"{len(lines)} lines")
+    for label, reference in (("state machine", True), ("regex scanner", False)):
+        seconds, count = best_time(lambda: tokenize_all(lines, reference), args.repeat)
+        print(
+            f"{label}: {count} tokens in {seconds:.3f}s, "
+            f"{count / seconds / 1000:.0f}k tokens/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+from .build import BuildManifest
+from .cache import StoryCache, TableCache
+from .filter import BookFilter
+from .index import GameDataIndex
 from .model import (
     Activity,
     ActivityType,
@@ -11,23 +15,55 @@ from .model import (
     Power,
     Profession,
     ScriptJsonEncoder,
+    StoryText,
     Voice,
 )
+from .prefetch import Prefetcher
+from .projection import Projection
 from .reader import Reader
+from .serialize import CborSerializer, JsonSerializer
+from .storage import (
+    DirectoryStorage,
+    GitStorage,
+    PackStorage,
+    Storage,
+    TarStorage,
+    ZipStorage,
+    open_storage,
+    write_pack,
+)
 
 __all__ = [
     "ActivityType",
     "ActorLine",
     "Activity",
     "AvgStory",
+    "BookFilter",
+    "BuildManifest",
+    "CborSerializer",
+    "DirectoryStorage",
     "EntryType",
+    "GameDataIndex",
     "GameDataForBook",
     "GameDataMetadata",
+    "GitStorage",
+    "JsonSerializer",
     "Operator",
     "OperatorStory",
+    "PackStorage",
+    "Prefetcher",
     "Power",
     "Profession",
+    "Projection",
     "Reader",
     "ScriptJsonEncoder",
+    "Storage",
+    "StoryCache",
+    "StoryText",
+    "TableCache",
+    "TarStorage",
     "Voice",
+    "ZipStorage",
+    "open_storage",
+    "write_pack",
 ]
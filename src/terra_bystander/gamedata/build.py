@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .cache import STORY_CACHE_VERSION
+
+# bump when entity building changes, so that previous builds are not reused
+BUILD_MANIFEST_VERSION = "1"
+
+
+def hash_row(row: Any) -> str:
+    """
+    Hash an excel row
+
+    :params row: json compatible value
+
+    :return: hex digest
+    """
+    raw = json.dumps(row, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def hash_data(data: bytes) -> str:
+    """
+    Hash file content
+
+    :params data: file content
+
+    :return: hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class EntityInputs:
+    """
+    Hashes of everything an activity or operator is built from
+    """
+
+    rows: dict[str, str] = field(default_factory=dict)
+    files: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def fingerprint(self) -> str:
+        return hash_row([BUILD_MANIFEST_VERSION, STORY_CACHE_VERSION, asdict(self)])
+
+
+class BuildManifest:
+    """
+    Manifest and entities of previous build, for reusing unchanged entities
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    ENTITIES_NAME = "entities.pickle"
+
+    def __init__(self, build_path: str | Path) -> None:
+        self.path = Path(build_path)
+        self.reused = 0
+        self.rebuilt = 0
+
+        # kind -> id -> (fingerprint, entity)
+        self._previous: dict[str, dict[str, tuple[str, Any]]] = {}
+        self._inputs: dict[str, dict[str, EntityInputs]] = {}
+        self._entities: dict[str, dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """
+        Load previous build, ignore it if missing or outdated
+        """
+        try:
+            with (self.path / self.ENTITIES_NAME).open("rb") as f:
+                version, previous = pickle.load(f)
+        except (OSError, ValueError, TypeError, EOFError, pickle.UnpicklingError):
+            return
+        if version == BUILD_MANIFEST_VERSION:
+            self._previous = previous
+
+    def reuse(self, kind: str, entity_id: str, inputs: EntityInputs) -> Any | None:
+        """
+        Record inputs of an entity and get it from previous build if unchanged
+
+        :params kind: entity kind, like `activities`
+        :params entity_id: entity id
+        :params inputs: inputs of the entity in current gamedata
+
+        :return: previous entity, None if it should be rebuilt
+        """
+        self._inputs.setdefault(kind, {})[entity_id] = inputs
+
+        previous = self._previous.get(kind, {}).get(entity_id)
+        if previous is None or previous[0] != inputs.fingerprint:
+            return None
+
+        entity = previous[1]
+        self._entities.setdefault(kind, {})[entity_id] = entity
+        self.reused += 1
+        return entity
+
+    def record(self, kind: str, entity_id: str, entity: Any) -> None:
+        """
+        Record a rebuilt entity
+
+        :params kind: entity kind, like `activities`
+        :params entity_id: entity id
+        :params entity: built entity
+        """
+        self._entities.setdefault(kind, {})[entity_id] = entity
+        self.rebuilt += 1
+
+    def save(self) -> None:
+        """
+        Save manifest and entities of current build
+        """
+        entities = {
+            kind: {
+                entity_id: (self._inputs[kind][entity_id].fingerprint, entity)
+                for entity_id, entity in kind_entities.items()
+            }
+            for kind, kind_entities in self._entities.items()
+        }
+        manifest = {
+            "version": BUILD_MANIFEST_VERSION,
+            "entities": {
+                kind: [
+                    {
+                        "id": entity_id,
+                        "fingerprint": inputs.fingerprint,
+                        "rows": inputs.rows,
+                        "files": inputs.files,
+                    }
+                    for entity_id, inputs in kind_inputs.items()
+                    if entity_id in self._entities.get(kind, {})
+                ]
+                for kind, kind_inputs in self._inputs.items()
+            },
+        }
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write(
+            self.ENTITIES_NAME,
+            pickle.dumps(
+                (BUILD_MANIFEST_VERSION, entities), protocol=pickle.HIGHEST_PROTOCOL
+            ),
+        )
+        self._write(
+            self.MANIFEST_NAME,
+            json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
+
+    def _write(self, filename: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path / filename)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
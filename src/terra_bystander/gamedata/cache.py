@@ -0,0 +1,339 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from .model import ActorLine
+from .storage import Storage
+
+# bump when lexer, parser or story conversion output changes
+STORY_CACHE_VERSION = "1"
+# bump when table loading or projections change
+TABLE_CACHE_VERSION = "1"
+
+# entry not in cache, tables may be any json value
+_MISSING = object()
+
+
+def _cache_home() -> Path:
+    """
+    Get base cache directory
+
+    :return: `$XDG_CACHE_HOME/terra_bystander` or `~/.cache/terra_bystander`
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if cache_home:
+        base = Path(cache_home)
+    else:
+        base = Path.home() / ".cache"
+    return base / "terra_bystander"
+
+
+def _write_atomic(file_path: Path, data: bytes) -> None:
+    """
+    Write file through a temporary file, safe to call from multiple processes
+
+    :params file_path: file to write
+    :params data: file content
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _prune(path: Path, pattern: str, max_size: int) -> None:
+    """
+    Evict least recently used files until they fit `max_size`
+
+    :params path: cache directory
+    :params pattern: glob of entry files in `path`
+    :params max_size: size limit in bytes
+    """
+    if not path.exists():
+        return
+
+    entries: list[tuple[float, int, Path]] = []
+    total_size = 0
+    for entry_path in path.glob(pattern):
+        try:
+            stat = entry_path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry_path))
+        total_size += stat.st_size
+
+    entries.sort()
+    for _, size, entry_path in entries:
+        if total_size <= max_size:
+            break
+        entry_path.unlink(missing_ok=True)
+        total_size -= size
+
+
+class StoryCache:
+    """
+    Content-addressed on-disk cache of converted story texts
+    """
+
+    def __init__(
+        self,
+        cache_path: str | Path,
+        max_size: int = 1024 * 1024 * 1024,
+    ) -> None:
+        self.path = Path(cache_path)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def default_path() -> Path:
+        """
+        Get default cache directory
+
+        :return: `$XDG_CACHE_HOME/terra_bystander/story` or `~/.cache/...`
+        """
+        return _cache_home() / "story"
+
+    @staticmethod
+    def key(raw_data: bytes) -> str:
+        """
+        Get cache key for raw story file
+
+        :params raw_data: raw bytes of story file
+
+        :return: hex digest
+        """
+        h = hashlib.sha256(STORY_CACHE_VERSION.encode("utf-8") + b"\0")
+        h.update(raw_data)
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+    def get(self, key: str) -> list[ActorLine] | None:
+        """
+        Get cached texts, mark entry as recently used
+
+        :params key: cache key
+
+        :return: `list[ActorLine]`, None if not cached
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with entry_path.open("rb") as f:
+                lines: list[tuple[str, str]] = pickle.load(f)
+            os.utime(entry_path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return [
+            ActorLine(sys.intern(name) if isinstance(name, str) else name, text)
+            for name, text in lines
+        ]
+
+    def put(self, key: str, texts: Sequence[ActorLine]) -> None:
+        """
+        Store texts in cache, safe to call from multiple processes
+
+        :params key: cache key
+        :params texts: converted story texts
+        """
+        _write_atomic(
+            self._entry_path(key),
+            pickle.dumps(
+                [(line.name, line.text) for line in texts],
+                protocol=pickle.HIGHEST_PROTOCOL,
+            ),
+        )
+
+    def record(self, hit: bool) -> None:
+        """
+        Count a cache lookup
+
+        :params hit: whether lookup hit
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def prune(self) -> None:
+        """
+        Evict least recently used entries until cache fits `max_size`
+        """
+        _prune(self.path, "*/*", self.max_size)
+
+
+class TableCache:
+    """
+    On-disk cache of parsed excel tables, stored with pickle
+
+    Tables are addressed by hash of their file content. A stat entry maps
+    storage, path, size and mtime of the file to that hash, so a warm start
+    with unchanged files neither reads nor decodes the json. Files whose
+    storage has a content id, like git blobs, are addressed by that id
+    instead. Files whose storage gives neither are read and hashed every
+    time.
+    """
+
+    def __init__(
+        self,
+        cache_path: str | Path,
+        max_size: int = 1024 * 1024 * 1024,
+        rebuild: bool = False,
+    ) -> None:
+        self.path = Path(cache_path)
+        self.max_size = max_size
+        # ignore entries, and replace them by decoding tables again
+        self.rebuild = rebuild
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def default_path() -> Path:
+        """
+        Get default cache directory
+
+        :return: `$XDG_CACHE_HOME/terra_bystander/table` or `~/.cache/...`
+        """
+        return _cache_home() / "table"
+
+    @staticmethod
+    def key(raw_data: bytes, variant: str = "") -> str:
+        """
+        Get cache key for raw table file
+
+        :params raw_data: raw bytes of table file
+        :params variant: how the table is decoded, like projected key paths
+
+        :return: hex digest
+        """
+        h = hashlib.sha256(f"{TABLE_CACHE_VERSION}\0{variant}\0".encode("utf-8"))
+        h.update(raw_data)
+        return h.hexdigest()
+
+    @staticmethod
+    def stat_key(
+        storage: Storage, path: str, stat: tuple[int, int], variant: str = ""
+    ) -> str:
+        """
+        Get key of stat entry for a table file
+
+        :params storage: gamedata storage
+        :params path: path of table file in storage
+        :params stat: size and mtime of table file
+        :params variant: how the table is decoded, like projected key paths
+
+        :return: hex digest
+        """
+        raw = "\0".join(
+            [TABLE_CACHE_VERSION, variant, repr(storage), path, *map(str, stat)]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def content_id_key(content_id: str, variant: str = "") -> str:
+        """
+        Get cache key for a table file by its content id in storage
+
+        :params content_id: id from `Storage.content_id`
+        :params variant: how the table is decoded, like projected key paths
+
+        :return: hex digest
+        """
+        raw = "\0".join([TABLE_CACHE_VERSION, variant, "content_id", content_id])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / "data" / key[:2] / key
+
+    def _stat_path(self, stat_key: str) -> Path:
+        return self.path / "stat" / stat_key[:2] / stat_key
+
+    def _get(self, key: str) -> Any:
+        entry_path = self._entry_path(key)
+        try:
+            with entry_path.open("rb") as f:
+                data = pickle.load(f)
+            os.utime(entry_path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+        return data
+
+    def load(
+        self,
+        storage: Storage,
+        path: str,
+        decode: Callable[[bytes], Any],
+        variant: str = "",
+    ) -> Any:
+        """
+        Get parsed table from cache, decode and store it if not cached
+
+        :params storage: gamedata storage
+        :params path: path of table file in storage
+        :params decode: decoder of raw table file, like `json.loads`
+        :params variant: how `decode` differs from others, part of the key
+
+        :return: parsed table
+        """
+        content_id = storage.content_id(path)
+        if content_id is not None:
+            key = self.content_id_key(content_id, variant)
+            data = _MISSING if self.rebuild else self._get(key)
+            if data is not _MISSING:
+                self.hits += 1
+                return data
+            self.misses += 1
+            data = decode(storage.read_bytes(path))
+            _write_atomic(
+                self._entry_path(key),
+                pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+            return data
+
+        stat = storage.stat(path)
+        stat_path: Path | None = None
+        if stat is not None:
+            stat_path = self._stat_path(self.stat_key(storage, path, stat, variant))
+            if not self.rebuild:
+                try:
+                    key = stat_path.read_text("ascii")
+                except OSError:
+                    pass
+                else:
+                    data = self._get(key)
+                    if data is not _MISSING:
+                        self.hits += 1
+                        return data
+
+        raw_data = storage.read_bytes(path)
+        key = self.key(raw_data, variant)
+        data = _MISSING if self.rebuild else self._get(key)
+        if data is not _MISSING:
+            self.hits += 1
+        else:
+            self.misses += 1
+            data = decode(raw_data)
+            _write_atomic(
+                self._entry_path(key),
+                pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+        if stat_path is not None:
+            _write_atomic(stat_path, key.encode("ascii"))
+        return data
+
+    def prune(self) -> None:
+        """
+        Evict least recently used entries until cache fits `max_size`
+        """
+        _prune(self.path, "*/*/*", self.max_size)
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Any
+
+from .model import ActivityType, EntryType, Profession
+
+
+@dataclass(slots=True, frozen=True)
+class BookFilter:
+    """
+    Subset of activities and operators to read, checked on excel rows
+    before any story file is opened
+
+    Empty fields match everything. An entity is kept if it matches all
+    fields of its kind. If only fields of one kind are set, entities of
+    the other kind are not read at all, so a book of one activity does
+    not contain every operator.
+
+    `powers` are ids or names of nation, group or team in
+    `handbook_team_table`, matching main and sub powers of operators.
+    """
+
+    activity_ids: frozenset[str] = frozenset()
+    entry_types: frozenset[EntryType] = frozenset()
+    activity_types: frozenset[ActivityType] = frozenset()
+    operator_ids: frozenset[str] = frozenset()
+    professions: frozenset[Profession] = frozenset()
+    powers: frozenset[str] = frozenset()
+
+    @property
+    def _filters_activities(self) -> bool:
+        return bool(self.activity_ids or self.entry_types or self.activity_types)
+
+    @property
+    def _filters_operators(self) -> bool:
+        return bool(self.operator_ids or self.professions or self.powers)
+
+    @property
+    def reads_activities(self) -> bool:
+        """
+        Whether any activity can match
+        """
+        return self._filters_activities or not self._filters_operators
+
+    @property
+    def reads_operators(self) -> bool:
+        """
+        Whether any operator can match
+        """
+        return self._filters_operators or not self._filters_activities
+
+    def match_activity(self, activity_data: dict[str, Any]) -> bool:
+        """
+        Check activity row
+
+        :params activity_data: activity dict in `story_review_table`
+
+        :return: `bool`
+        """
+        if not self.reads_activities:
+            return False
+        if self.activity_ids and activity_data["id"] not in self.activity_ids:
+            return False
+        if (
+            self.entry_types
+            and EntryType(activity_data["entryType"]) not in self.entry_types
+        ):
+            return False
+        if (
+            self.activity_types
+            and ActivityType(activity_data["actType"]) not in self.activity_types
+        ):
+            return False
+        return True
+
+    def match_operator(
+        self,
+        operator_id: str,
+        operator_data: dict[str, Any],
+        handbook_team_table: dict[str, Any],
+    ) -> bool:
+        """
+        Check operator row
+
+        :params operator_id: operator id
+        :params operator_data: operator dict in `character_table`
+        :params handbook_team_table: `handbook_team_table`, for power names
+
+        :return: `bool`
+        """
+        if not self.reads_operators:
+            return False
+        if self.operator_ids and operator_id not in self.operator_ids:
+            return False
+        if (
+            self.professions
+            and Profession(operator_data["profession"]) not in self.professions
+        ):
+            return False
+        if self.powers:
+            powers: list[dict[str, Any]] = [operator_data["mainPower"]]
+            powers += operator_data["subPower"] or []
+            for power in powers:
+                for power_id in (power["nationId"], power["groupId"], power["teamId"]):
+                    if power_id is None:
+                        continue
+                    if power_id in self.powers:
+                        return True
+                    team = handbook_team_table.get(power_id)
+                    if team is not None and team["powerName"] in self.powers:
+                        return True
+            return False
+        return True
@@ -0,0 +1,187 @@
+import json
+from collections.abc import Callable, Iterable
+from functools import cached_property
+from typing import Any
+
+from .cache import TableCache
+from .projection import Projection
+from .storage import Storage
+
+# fields of big tables that are read, other fields are not loaded
+TABLE_PROJECTIONS: dict[str, tuple[str, ...]] = {
+    "stage_table": ("stages.*.description",),
+    "character_table": (
+        "*.{name,appellation,itemUsage,itemDesc,profession,subProfessionId,"
+        "mainPower,subPower,sortIndex}",
+    ),
+    "handbook_info_table": (
+        "handbookDict.*.handbookAvgList",
+        "handbookDict.*.storyTextAudio.*.storyTitle",
+        "handbookDict.*.storyTextAudio.*.stories.*.storyText",
+    ),
+    "handbook_team_table": ("*.powerName",),
+    "uniequip_table": (
+        "subProfDict.*.subProfessionName",
+        "equipDict.*.{charId,charEquipOrder,uniEquipId,typeName1,typeName2,"
+        "uniEquipName,uniEquipDesc}",
+    ),
+    "charword_table": ("charWords.*.{charId,voiceIndex,voiceTitle,voiceText}",),
+}
+
+
+class GameDataIndex:
+    """
+    Excel tables of gamedata, each loaded once, with id-keyed lookups
+
+    Tables in `projections` are loaded with only the listed key paths,
+    pass None to load all tables whole. With `cache`, parsed tables are
+    loaded from it instead of decoding json again.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        projections: dict[str, tuple[str, ...]] | None = TABLE_PROJECTIONS,
+        cache: TableCache | None = None,
+    ) -> None:
+        self.storage = storage
+        self.cache = cache
+        self._projections: dict[str, Projection] = {
+            filename: Projection(paths)
+            for filename, paths in (projections or {}).items()
+        }
+        self._tables: dict[str, Any] = {}
+
+    def table(self, filename: str) -> Any:
+        """
+        Get data of `excel/{filename}.json`, loaded on first access
+
+        :params filename: File name without `.json`
+
+        :return: `Any`, only fields in projection of the table if any
+        """
+        if filename not in self._tables:
+            path = f"excel/{filename}.json"
+            projection = self._projections.get(filename)
+            decode: Callable[[bytes], Any] = json.loads
+            if projection is not None:
+                decode = projection.load
+
+            if self.cache is not None:
+                variant = "\n".join(projection.paths) if projection is not None else ""
+                self._tables[filename] = self.cache.load(
+                    self.storage, path, decode, variant
+                )
+            else:
+                self._tables[filename] = decode(self.storage.read_bytes(path))
+        return self._tables[filename]
+
+    @cached_property
+    def _stories(self) -> dict[tuple[str, str], dict[str, Any]]:
+        stories: dict[tuple[str, str], dict[str, Any]] = {}
+        for activity_id, activity_data in self.table("story_review_table").items():
+            for story in activity_data["infoUnlockDatas"]:
+                stories.setdefault((activity_id, story["storyId"]), story)
+        return stories
+
+    @cached_property
+    def _story_ids(self) -> dict[str, tuple[str, dict[str, Any]]]:
+        story_ids: dict[str, tuple[str, dict[str, Any]]] = {}
+        for activity_id, activity_data in self.table("story_review_table").items():
+            for story in activity_data["infoUnlockDatas"]:
+                story_ids.setdefault(story["storyId"], (activity_id, story))
+        return story_ids
+
+    @cached_property
+    def _handbook_stories(self) -> dict[str, dict[str, Any]]:
+        stories: dict[str, dict[str, Any]] = {}
+        handbook_dict = self.table("handbook_info_table")["handbookDict"]
+        for operator_handbook_info in handbook_dict.values():
+            for operator_activity in operator_handbook_info["handbookAvgList"]:
+                for story in operator_activity["avgList"]:
+                    stories.setdefault(story["storyId"], story)
+        return stories
+
+    @cached_property
+    def _voices(self) -> dict[str, list[dict[str, Any]]]:
+        return self._group_by_char(
+            self.table("charword_table")["charWords"].values(), "voiceIndex"
+        )
+
+    @cached_property
+    def _uniequips(self) -> dict[str, list[dict[str, Any]]]:
+        return self._group_by_char(
+            self.table("uniequip_table")["equipDict"].values(), "charEquipOrder"
+        )
+
+    @staticmethod
+    def _group_by_char(
+        rows: Iterable[dict[str, Any]], order_key: str
+    ) -> dict[str, list[dict[str, Any]]]:
+        """
+        Group rows by `charId` in one pass, sorted by `order_key`,
+        later rows replace earlier ones with the same order
+
+        :params rows: rows with `charId`
+        :params order_key: key to sort rows of each operator
+
+        :return: rows keyed by `charId`
+        """
+        groups: dict[str, dict[int, dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(row["charId"], {})[row[order_key]] = row
+        return {
+            char_id: [group[i] for i in sorted(group)]
+            for char_id, group in groups.items()
+        }
+
+    def story(self, story_set_id: str, story_id: str) -> dict[str, Any] | None:
+        """
+        Get story dict in `story_review_table`
+
+        :params story_set_id: Id of activity
+        :params story_id: Id of story
+
+        :return: `dict[str, Any]`, None if not found
+        """
+        return self._stories.get((story_set_id, story_id))
+
+    def story_by_id(self, story_id: str) -> tuple[str, dict[str, Any]] | None:
+        """
+        Find story in `story_review_table` by its id only
+
+        :params story_id: Id of story
+
+        :return: Id of its activity and story dict, None if not found
+        """
+        return self._story_ids.get(story_id)
+
+    def handbook_story(self, story_id: str) -> dict[str, Any] | None:
+        """
+        Find story of an operator record in `handbook_info_table`
+
+        :params story_id: Id of story
+
+        :return: story dict in `avgList`, None if not found
+        """
+        return self._handbook_stories.get(story_id)
+
+    def voices(self, operator_id: str) -> list[dict[str, Any]]:
+        """
+        Get voice rows of the operator in `charword_table`
+
+        :params operator_id: operator id
+
+        :return: rows sorted by `voiceIndex`
+        """
+        return self._voices.get(operator_id, [])
+
+    def uniequips(self, operator_id: str) -> list[dict[str, Any]]:
+        """
+        Get uniequip rows of the operator in `uniequip_table`
+
+        :params operator_id: operator id
+
+        :return: rows sorted by `charEquipOrder`
+        """
+        return self._uniequips.get(operator_id, [])
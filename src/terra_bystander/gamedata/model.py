@@ -1,7 +1,10 @@
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import asdict, dataclass
 from enum import Enum
 from json import JSONEncoder
-from typing import Any
+from typing import Any, overload
 
 
 # Game data
@@ -19,13 +22,111 @@ class ActivityType(Enum):
     NONE = "NONE"
 
 
-@dataclass
+@dataclass(slots=True)
 class ActorLine:
     name: str
     text: str
 
 
-@dataclass
+class StoryText(Sequence[ActorLine]):
+    """
+    Columnar story texts, one text buffer with offsets and speaker ids,
+    behaves like an immutable `list[ActorLine]`
+    """
+
+    __slots__ = ("_text", "_offsets", "_speakers", "_speaker_ids")
+
+    def __init__(self, lines: Iterable[ActorLine] = ()) -> None:
+        texts: list[str] = []
+        offsets = array("Q", [0])
+        speakers: list[str] = []
+        speaker_index: dict[str, int] = {}
+        speaker_ids = array("I")
+
+        for line in lines:
+            texts.append(line.text)
+            offsets.append(offsets[-1] + len(line.text))
+            if line.name not in speaker_index:
+                speaker_index[line.name] = len(speakers)
+                speakers.append(
+                    sys.intern(line.name) if isinstance(line.name, str) else line.name
+                )
+            speaker_ids.append(speaker_index[line.name])
+
+        self._text = "".join(texts)
+        self._offsets = offsets
+        self._speakers = speakers
+        self._speaker_ids = speaker_ids
+
+    @classmethod
+    def _from_columns(
+        cls,
+        text: str,
+        offsets: array,
+        speakers: list[str],
+        speaker_ids: array,
+    ) -> "StoryText":
+        story_text = cls.__new__(cls)
+        story_text._text = text
+        story_text._offsets = offsets
+        story_text._speakers = [
+            sys.intern(speaker) if isinstance(speaker, str) else speaker
+            for speaker in speakers
+        ]
+        story_text._speaker_ids = speaker_ids
+        return story_text
+
+    def __len__(self) -> int:
+        return len(self._speaker_ids)
+
+    def _line(self, index: int) -> ActorLine:
+        return ActorLine(
+            self._speakers[self._speaker_ids[index]],
+            self._text[self._offsets[index] : self._offsets[index + 1]],
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> ActorLine: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ActorLine]: ...
+
+    def __getitem__(self, index: int | slice) -> ActorLine | list[ActorLine]:
+        if isinstance(index, slice):
+            return [self._line(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StoryText index out of range")
+        return self._line(index)
+
+    def __iter__(self) -> Iterator[ActorLine]:
+        for i in range(len(self)):
+            yield self._line(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (StoryText, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"StoryText({list(self)!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (
+            StoryText._from_columns,
+            (self._text, self._offsets, self._speakers, self._speaker_ids),
+        )
+
+    # immutable, no need to copy for `asdict`
+    def __copy__(self) -> "StoryText":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "StoryText":
+        return self
+
+
+@dataclass(slots=True)
 class AvgStory:
     id: str
     name: str
@@ -34,10 +135,10 @@ class AvgStory:
     avg_tag: str
     description: str
     info: str
-    texts: list[ActorLine]
+    texts: list[ActorLine] | StoryText
 
 
-@dataclass
+@dataclass(slots=True)
 class Activity:
     id: str
     name: str
@@ -47,14 +148,14 @@ class Activity:
     stories: list[AvgStory]
 
 
-@dataclass
+@dataclass(slots=True)
 class Power:
     nation: str | None = None
     group: str | None = None
     team: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class OperatorStory:
     title: str
     text: str
@@ -71,13 +172,13 @@ class Profession(Enum):
     TANK = "TANK"
 
 
-@dataclass
+@dataclass(slots=True)
 class Voice:
     title: str
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class UniEquip:
     id: str
     type_name_1: str
@@ -86,7 +187,7 @@ class UniEquip:
     description: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Operator:
     id: str
     name: str
@@ -103,13 +204,13 @@ class Operator:
     uniequips: list[UniEquip] | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class GameDataMetadata:
     version: str
     date: str
 
 
-@dataclass
+@dataclass(slots=True)
 class GameDataForBook:
     metadata: GameDataMetadata
     activities: list[Activity]
@@ -129,6 +230,8 @@ class ScriptJsonEncoder(JSONEncoder):
             or isinstance(o, GameDataForBook)
         ):
             return asdict(o)
+        if isinstance(o, StoryText):
+            return list(o)
         if isinstance(o, Enum):
             return o.value
         return super().default(o)
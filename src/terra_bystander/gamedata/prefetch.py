@@ -0,0 +1,83 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .storage import Storage
+
+
+class Prefetcher(Storage):
+    """
+    Storage reading files of upcoming entities on a thread pool while the
+    caller converts the current one, so waiting on slow storage overlaps
+    parsing
+
+    At most `depth` files are read ahead, files of the next entity are
+    always requested even if it has more. Files of the current entity in
+    `iter_prefetched` are served from the prefetched ones, other files are
+    read directly.
+    """
+
+    def __init__(self, storage: Storage, depth: int = 32, threads: int = 4) -> None:
+        self.storage = storage
+        self.depth = depth
+        self.threads = threads
+        self._current: dict[str, Future[bytes]] = {}
+
+    def iter_prefetched[T](
+        self, entities: Iterable[T], paths: Callable[[T], Iterable[str]]
+    ) -> Iterator[T]:
+        """
+        Iterate entities, reading files of the following ones ahead
+
+        :params entities: entities in order of use
+        :params paths: files an entity reads
+
+        :return: `entities`, files of each are prefetched until the next is taken
+        """
+        window: deque[tuple[T, dict[str, Future[bytes]]]] = deque()
+        in_flight = 0
+        remaining = iter(entities)
+        exhausted = False
+
+        executor = ThreadPoolExecutor(self.threads, thread_name_prefix="prefetch")
+        try:
+            while True:
+                while not exhausted and (in_flight < self.depth or not window):
+                    try:
+                        entity = next(remaining)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    futures = {
+                        path: executor.submit(self.storage.read_bytes, path)
+                        for path in dict.fromkeys(paths(entity))
+                    }
+                    window.append((entity, futures))
+                    in_flight += len(futures)
+
+                if not window:
+                    return
+                entity, self._current = window.popleft()
+                in_flight -= len(self._current)
+                yield entity
+        finally:
+            self._current = {}
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def read_bytes(self, path: str) -> bytes:
+        future = self._current.get(path)
+        if future is None:
+            return self.storage.read_bytes(path)
+        return future.result()
+
+    def names(self) -> Iterator[str]:
+        return self.storage.names()
+
+    def stat(self, path: str) -> tuple[int, int] | None:
+        return self.storage.stat(path)
+
+    def content_id(self, path: str) -> str | None:
+        return self.storage.content_id(path)
+
+    def __repr__(self) -> str:
+        return f"Prefetcher({self.storage!r}, depth={self.depth})"
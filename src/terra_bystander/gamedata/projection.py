@@ -0,0 +1,182 @@
+import json
+import re
+from collections.abc import Iterable
+from json.decoder import JSONDecodeError, scanstring
+from json.scanner import make_scanner
+from typing import Any
+
+# keep the whole value
+_LEAF = None
+# key of children matching any key or list item
+_ANY = "*"
+
+# value not declared, parsed and dropped
+_SKIP = object()
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _skip_whitespace(s: str, idx: int) -> int:
+    match = _WHITESPACE.match(s, idx)
+    assert match is not None
+    return match.end()
+
+
+def _parse_path(path: str) -> list[list[str]]:
+    """
+    Split key path like `charWords.*.{charId,voiceText}`
+
+    :params path: dot separated keys, `*` for any key or item,
+        `{a,b}` for several keys
+
+    :return: keys of each level
+    """
+    levels: list[list[str]] = []
+    for segment in re.findall(r"\{[^}]*\}|[^.]+", path):
+        if segment.startswith("{"):
+            levels.append([key.strip() for key in segment[1:-1].split(",")])
+        else:
+            levels.append([segment])
+    return levels
+
+
+class Projection:
+    """
+    Load only declared key paths of a json file, everything else is
+    parsed and dropped value by value instead of kept in memory
+
+    Rows, objects whose declared keys are all kept whole, are parsed in
+    one call and filtered, so at most one row is held in full at a time.
+    """
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self.paths: tuple[str, ...] = tuple(paths)
+        self._tree: dict[str, Any] = {}
+        for path in self.paths:
+            self._add(_parse_path(path))
+
+        decoder = json.JSONDecoder()
+        self._scan_once = make_scanner(decoder)
+
+    def _add(self, levels: list[list[str]]) -> None:
+        nodes: list[dict[str, Any]] = [self._tree]
+        for depth, keys in enumerate(levels):
+            last = depth == len(levels) - 1
+            children: list[dict[str, Any]] = []
+            for node in nodes:
+                for key in keys:
+                    if last:
+                        node[key] = _LEAF
+                    elif key not in node:
+                        node[key] = {}
+                    if node[key] is not _LEAF:
+                        children.append(node[key])
+            nodes = children
+
+    def load(self, raw_data: bytes | str) -> Any:
+        """
+        Parse json keeping only declared key paths
+
+        :params raw_data: json document
+
+        :return: projected value, objects keep key order of the document
+        """
+        if isinstance(raw_data, bytes):
+            raw_data = raw_data.decode(json.detect_encoding(raw_data))
+
+        idx = _skip_whitespace(raw_data, 0)
+        # share key strings between rows like `json.loads`
+        memo: dict[str, str] = {}
+        value, idx = self._parse(raw_data, idx, self._tree, memo)
+        idx = _skip_whitespace(raw_data, idx)
+        if idx != len(raw_data):
+            raise JSONDecodeError("Extra data", raw_data, idx)
+        return value
+
+    def _scan(self, s: str, idx: int) -> tuple[Any, int]:
+        try:
+            return self._scan_once(s, idx)
+        except StopIteration as e:
+            raise JSONDecodeError("Expecting value", s, e.value) from None
+
+    def _parse(
+        self, s: str, idx: int, node: dict[str, Any] | None, memo: dict[str, str]
+    ) -> tuple[Any, int]:
+        if node is _LEAF or idx >= len(s) or s[idx] not in "{[":
+            return self._scan(s, idx)
+
+        if _ANY not in node and all(child is _LEAF for child in node.values()):
+            # a row, parsed in one call and filtered
+            value, idx = self._scan(s, idx)
+            if isinstance(value, dict):
+                return {
+                    memo.setdefault(key, key): item
+                    for key, item in value.items()
+                    if key in node
+                }, idx
+            return [], idx
+
+        if s[idx] == "[":
+            return self._parse_array(s, idx, node, memo)
+        return self._parse_object(s, idx, node, memo)
+
+    def _parse_object(
+        self, s: str, idx: int, node: dict[str, Any], memo: dict[str, str]
+    ) -> tuple[dict[str, Any], int]:
+        result: dict[str, Any] = {}
+        any_child = node.get(_ANY, _SKIP)
+        idx = _skip_whitespace(s, idx + 1)
+        if s[idx : idx + 1] == "}":
+            return result, idx + 1
+
+        while True:
+            if s[idx : idx + 1] != '"':
+                raise JSONDecodeError(
+                    "Expecting property name enclosed in double quotes", s, idx
+                )
+            key, idx = scanstring(s, idx + 1)
+            idx = _skip_whitespace(s, idx)
+            if s[idx : idx + 1] != ":":
+                raise JSONDecodeError("Expecting ':' delimiter", s, idx)
+            idx = _skip_whitespace(s, idx + 1)
+
+            child = node.get(key, any_child)
+            if child is _SKIP:
+                _, idx = self._scan(s, idx)
+            else:
+                key = memo.setdefault(key, key)
+                result[key], idx = self._parse(s, idx, child, memo)
+
+            idx = _skip_whitespace(s, idx)
+            delimiter = s[idx : idx + 1]
+            if delimiter == ",":
+                idx = _skip_whitespace(s, idx + 1)
+            elif delimiter == "}":
+                return result, idx + 1
+            else:
+                raise JSONDecodeError("Expecting ',' delimiter", s, idx)
+
+    def _parse_array(
+        self, s: str, idx: int, node: dict[str, Any], memo: dict[str, str]
+    ) -> tuple[list[Any], int]:
+        result: list[Any] = []
+        child = node.get(_ANY, _SKIP)
+        idx = _skip_whitespace(s, idx + 1)
+        if s[idx : idx + 1] == "]":
+            return result, idx + 1
+
+        while True:
+            if child is _SKIP:
+                _, idx = self._scan(s, idx)
+            else:
+                value, idx = self._parse(s, idx, child, memo)
+                result.append(value)
+
+            idx = _skip_whitespace(s, idx)
+            delimiter = s[idx : idx + 1]
+            if delimiter == ",":
+                idx = _skip_whitespace(s, idx + 1)
+            elif delimiter == "]":
+                return result, idx + 1
+            else:
+                raise JSONDecodeError("Expecting ',' delimiter", s, idx)
@@ -1,14 +1,24 @@
-import json
 import re
+import sys
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
 from ..script import (
     Call,
+    CommandRegistry,
+    Diagnostic,
     Parser,
     Property,
-    Tokenizer,
+    ScriptLine,
 )
+from .build import BuildManifest, EntityInputs, hash_data, hash_row
+from .cache import StoryCache, TableCache
+from .filter import BookFilter
+from .index import GameDataIndex
 from .model import (
     Activity,
     ActivityType,
@@ -21,9 +31,101 @@ from .model import (
     OperatorStory,
     Power,
     Profession,
+    StoryText,
     UniEquip,
     Voice,
 )
+from .prefetch import Prefetcher
+from .storage import Storage, decode_text, open_storage
+
+STORY_COMMANDS: CommandRegistry[list[ActorLine]] = CommandRegistry()
+
+
+@STORY_COMMANDS.on_text
+def _story_actor_text(line: ScriptLine, lines: list[ActorLine]) -> None:
+    if line.actor_text is not None:
+        lines.append(ActorLine("", line.actor_text))
+
+
+@STORY_COMMANDS.on_property("name")
+def _story_name(action: Property, line: ScriptLine, lines: list[ActorLine]) -> bool:
+    name = action.value
+    if isinstance(name, str):
+        # few speakers repeat in every story
+        name = sys.intern(name)
+    lines.append(
+        ActorLine(name, line.actor_text if line.actor_text is not None else "")
+    )
+    return True
+
+
+@STORY_COMMANDS.on_call("background")
+def _story_background(action: Call, line: ScriptLine, lines: list[ActorLine]) -> bool:
+    lines.append(ActorLine("", ""))
+    return True
+
+
+def _read_story(
+    storage: Storage,
+    story_path: str,
+    cache: StoryCache | None,
+    compact: bool,
+    recover: bool,
+) -> tuple[list[ActorLine] | StoryText, bool, list[Diagnostic]]:
+    """
+    Read and convert a story file
+
+    :params storage: gamedata storage
+    :params story_path: path of story file in storage
+    :params cache: story cache, skip conversion if file is cached
+    :params compact: return `StoryText` instead of `list[ActorLine]`
+    :params recover: skip lines with syntax errors instead of raising
+
+    :return: converted texts, whether it is a cache hit and skipped errors
+    """
+    raw_data = storage.read_bytes(story_path)
+    diagnostics: list[Diagnostic] | None = [] if recover else None
+
+    hit = False
+    if cache is None:
+        texts = Reader._convert_story_text(
+            decode_text(raw_data), story_path, diagnostics
+        )
+    else:
+        key = cache.key(raw_data)
+        cached_texts = cache.get(key)
+        if cached_texts is not None:
+            texts, hit = cached_texts, True
+        else:
+            texts = Reader._convert_story_text(
+                decode_text(raw_data), story_path, diagnostics
+            )
+            # keep reporting errors until the story is fixed
+            if not diagnostics:
+                cache.put(key, texts)
+
+    if compact:
+        return StoryText(texts), hit, diagnostics or []
+    return texts, hit, diagnostics or []
+
+
+# arguments of `_read_story` in worker process, sent once by `_init_worker`
+_worker_state: tuple[Storage, StoryCache | None, bool, bool] | None = None
+
+
+def _init_worker(
+    storage: Storage, cache: StoryCache | None, compact: bool, recover: bool
+) -> None:
+    global _worker_state
+    _worker_state = (storage, cache, compact, recover)
+
+
+def _read_story_in_worker(
+    story_path: str,
+) -> tuple[list[ActorLine] | StoryText, bool, list[Diagnostic]]:
+    assert _worker_state is not None
+    storage, cache, compact, recover = _worker_state
+    return _read_story(storage, story_path, cache, compact, recover)
 
 
 class Reader:
@@ -31,23 +133,69 @@ class Reader:
     Read gamedata
     """
 
+    # entities whose stories are read in one batch per worker
+    BATCH_SIZE_PER_WORKER = 4
+
+    # handlers extracting `ActorLine` from story lines
+    STORY_COMMANDS: CommandRegistry[list[ActorLine]] = STORY_COMMANDS
+
     def __init__(
         self,
-        gamedata_path: str | Path,
-        secondary_gamedata_path: str | Path | None = None,
+        gamedata_path: str | Path | Storage,
+        secondary_gamedata_path: str | Path | Storage | None = None,
+        workers: int = 1,
+        cache: StoryCache | None = None,
+        build: BuildManifest | None = None,
+        compact: bool = False,
+        recover: bool = False,
+        table_cache: TableCache | None = None,
+        book_filter: BookFilter | None = None,
+        prefetch: int = 0,
     ):
-        self.path = Path(gamedata_path)
-        self.story_review_table: dict[str, Any] = self._read_excel_data(
-            "story_review_table"
-        )
+        if isinstance(gamedata_path, Storage):
+            self.storage = gamedata_path
+        else:
+            self.storage = open_storage(gamedata_path)
+        self.workers = workers
+        self.cache = cache
+        self.build = build
+        self.compact = compact
+        self.recover = recover
+        self.table_cache = table_cache
+        # subset of entities read by `iter_activities` and `iter_operators`
+        self.book_filter = book_filter
+        # story and info files of upcoming entities read ahead on threads
+        self.prefetcher: Prefetcher | None = None
+        if prefetch > 0:
+            self.prefetcher = Prefetcher(self.storage, prefetch)
+        self._files: Storage = self.prefetcher or self.storage
+        # syntax errors skipped in recovery mode
+        self.diagnostics: list[Diagnostic] = []
+        self._diagnostic_stories: set[str] = set()
+        # files read once per run, shared by stories referencing the same file
+        self._shared_paths: frozenset[str] | None = None
+        self._story_memo: dict[str, list[ActorLine] | StoryText] = {}
+        self._info_memo: dict[str, str] = {}
+        self._hash_memo: dict[str, str] = {}
+        # reads of story and info files answered by the memo
+        self.deduplicated_reads = 0
+        self._executor: Executor | None = None
+        self.index = GameDataIndex(self.storage, cache=table_cache)
+        self.story_review_table: dict[str, Any] = self.index.table("story_review_table")
 
         if secondary_gamedata_path is not None and secondary_gamedata_path != "":
-            self.secondary_path: Path | None = Path(secondary_gamedata_path)
+            if isinstance(secondary_gamedata_path, Storage):
+                secondary_storage = secondary_gamedata_path
+            else:
+                secondary_storage = open_storage(secondary_gamedata_path)
+            self.secondary_index: GameDataIndex | None = GameDataIndex(
+                secondary_storage, cache=table_cache
+            )
             self.secondary_story_review_table: dict[str, Any] = (
-                self._read_secondary_excel_data("story_review_table")
+                self.secondary_index.table("story_review_table")
             )
         else:
-            self.secondary_path: Path | None = None
+            self.secondary_index: GameDataIndex | None = None
             self.secondary_story_review_table = {}
 
     def read_data(self) -> GameDataForBook:
@@ -56,63 +204,234 @@ class Reader:
 
         :return: `GameDataForBook`
         """
-        return GameDataForBook(
-            metadata=self._read_metadata(),
-            activities=self._read_activities(),
-            operators=self._read_operators(),
+        with self._worker_pool():
+            data = GameDataForBook(
+                metadata=self.read_metadata(),
+                activities=list(self.iter_activities()),
+                operators=list(self.iter_operators()),
+            )
+        self.finish()
+        return data
+
+    def finish(self) -> None:
+        """
+        Prune caches and save build manifest, call after all entities are read
+        """
+        if self.cache is not None:
+            self.cache.prune()
+        if self.table_cache is not None:
+            self.table_cache.prune()
+        if self.build is not None:
+            self.build.save()
+
+    def _has_diagnostics(self, story_txts: Iterable[str]) -> bool:
+        """
+        Check whether syntax errors were skipped in any of the stories,
+        entities built from them are not kept for incremental builds
+
+        :params story_txts: `storyTxt` of stories
+
+        :return: `bool`
+        """
+        return bool(self._diagnostic_stories) and any(
+            story_txt in self._diagnostic_stories for story_txt in story_txts
+        )
+
+    def write_diagnostics(self, f: TextIO) -> None:
+        """
+        Write summary of syntax errors skipped in recovery mode
+
+        :params f: output file
+        """
+        if not self.diagnostics:
+            return
+        f.write(
+            f"Skipped {len(self.diagnostics)} lines with syntax errors "
+            f"in {len(self._diagnostic_stories)} stories:\n"
         )
+        for diagnostic in self.diagnostics:
+            f.write(f"  {diagnostic}\n")
+
+    @contextmanager
+    def _worker_pool(self) -> Iterator[None]:
+        """
+        Run story conversion in worker processes within the context
+        """
+        if self.workers <= 1 or self._executor is not None:
+            yield
+            return
+
+        with ProcessPoolExecutor(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.storage, self.cache, self.compact, self.recover),
+        ) as executor:
+            self._executor = executor
+            try:
+                yield
+            finally:
+                self._executor = None
+
+    def _batches[T](self, items: Sequence[T]) -> Iterator[Sequence[T]]:
+        """
+        Split entities into batches whose stories are read together
+
+        :params items: entities
+
+        :return: batches in order
+        """
+        batch_size = 1
+        if self._executor is not None:
+            batch_size = self.workers * self.BATCH_SIZE_PER_WORKER
+        for i in range(0, len(items), batch_size):
+            yield items[i : i + batch_size]
+
+    def _prefetched[T](
+        self, batches: Iterable[T], stories: Callable[[T], Iterable[dict[str, Any]]]
+    ) -> Iterable[T]:
+        """
+        Read story and info files of upcoming batches ahead, only when stories
+        are converted in this process
+
+        :params batches: batches in order
+        :params stories: story dicts of a batch
+
+        :return: `batches`
+        """
+        if self.prefetcher is None or self._executor is not None:
+            return batches
+
+        def paths(batch: T) -> Iterator[str]:
+            for story in stories(batch):
+                for path in self._story_paths(story):
+                    if path not in self._story_memo and path not in self._info_memo:
+                        yield path
+
+        return self.prefetcher.iter_prefetched(batches, paths)
+
+    def _read_story_texts(
+        self, story_txts: Iterable[str]
+    ) -> dict[str, list[ActorLine] | StoryText]:
+        """
+        Read and convert story files, in worker processes if available,
+        files already read in this run are taken from memo
+
+        :params story_txts: `storyTxt` of stories, relative to `story` without `.txt`
+
+        :return: converted texts keyed by `storyTxt`
+        """
+        story_texts: dict[str, list[ActorLine] | StoryText] = {}
+        requested = list(story_txts)
+        story_txts = []
+        for story_txt in dict.fromkeys(requested):
+            memoized = self._story_memo.get(f"story/{story_txt}.txt")
+            if memoized is not None:
+                story_texts[story_txt] = memoized
+            else:
+                story_txts.append(story_txt)
+        self.deduplicated_reads += len(requested) - len(story_txts)
+        story_paths = [f"story/{txt}.txt" for txt in story_txts]
+
+        if self._executor is None:
+            results = (
+                _read_story(
+                    self._files, story_path, self.cache, self.compact, self.recover
+                )
+                for story_path in story_paths
+            )
+        else:
+            chunksize = max(1, len(story_paths) // (self.workers * 4))
+            results = self._executor.map(
+                _read_story_in_worker, story_paths, chunksize=chunksize
+            )
 
-    def _convert_story_text(self, raw_text: str) -> list[ActorLine]:
+        for story_txt, story_path, (texts, hit, diagnostics) in zip(
+            story_txts, story_paths, results
+        ):
+            if self.cache is not None:
+                self.cache.record(hit)
+            if diagnostics:
+                self.diagnostics.extend(diagnostics)
+                self._diagnostic_stories.add(story_txt)
+            if self._is_shared(story_path):
+                self._story_memo[story_path] = texts
+            story_texts[story_txt] = texts
+        return story_texts
+
+    @staticmethod
+    def _story_paths(story: dict[str, Any]) -> list[str]:
+        """
+        Get paths of story file and info file of a story
+
+        :params story: story dict
+
+        :return: paths relative to gamedata, info file only if the story has one
+        """
+        paths = [f"story/{story['storyTxt']}.txt"]
+        if "storyInfo" in story and story["storyInfo"]:
+            paths.append(f"story/[uc]{story['storyInfo']}.txt")
+        return paths
+
+    def _prepare_memo(self) -> None:
+        """
+        Find story and info files referenced by more than one story to read,
+        only these are kept in memory once read
+        """
+        if self._shared_paths is not None:
+            return
+
+        stories: list[dict[str, Any]] = [
+            story
+            for activity_data in self.story_review_table.values()
+            if self._is_book_activity(activity_data)
+            and (
+                self.book_filter is None
+                or self.book_filter.match_activity(activity_data)
+            )
+            for story in activity_data["infoUnlockDatas"]
+        ]
+        if self.book_filter is None or self.book_filter.reads_operators:
+            handbook_info_table = self.index.table("handbook_info_table")
+            for operator_handbook_info in handbook_info_table["handbookDict"].values():
+                for operator_activity in operator_handbook_info["handbookAvgList"]:
+                    stories += operator_activity["avgList"]
+
+        uses = Counter(path for story in stories for path in self._story_paths(story))
+        self._shared_paths = frozenset(path for path, n in uses.items() if n > 1)
+
+    def _is_shared(self, path: str) -> bool:
+        return self._shared_paths is not None and path in self._shared_paths
+
+    @staticmethod
+    def _convert_story_text(
+        raw_text: str,
+        path: str | None = None,
+        diagnostics: list[Diagnostic] | None = None,
+    ) -> list[ActorLine]:
         """
         Convert story text to structured data
 
         :params raw_text: story text
+        :params path: story path in error messages
+        :params diagnostics: if not None, record syntax errors here and skip their lines
 
         :return: `list[ActorLine]`
         """
-        raw_lines = Tokenizer.split_code_lines(raw_text)
-        ast_lines = [Parser(Tokenizer.tokenize(line)).parse() for line in raw_lines]
-
+        commands = Reader.STORY_COMMANDS
         lines: list[ActorLine] = []
-        for line in ast_lines:
-            if line.actions is None:
-                if line.actor_text is not None:
-                    lines.append(ActorLine("", line.actor_text))
-                continue
-
-            for action in line.actions:
-                if isinstance(action, Property) and action.key == "name":
-                    if line.actor_text is not None:
-                        text = line.actor_text
-                    else:
-                        text = ""
-                    lines.append(
-                        ActorLine(
-                            action.value,
-                            text,
-                        )
-                    )
-                    break
-                if isinstance(action, Call) and action.name.lower() == "background":
-                    lines.append(
-                        ActorLine(
-                            "",
-                            "",
-                        )
-                    )
-                    break
+        for _, script_line in Parser.parse_source(
+            raw_text, path, commands.classifier().is_relevant, diagnostics
+        ):
+            commands.dispatch(script_line, lines)
         return lines
 
-    def _read_metadata(self) -> GameDataMetadata:
+    def read_metadata(self) -> GameDataMetadata:
         """
         Read gamedata metadata
 
         :return: `GameDataMetadata`
         """
-        with (self.path / "excel" / "data_version.txt").open(
-            "r", encoding="utf-8"
-        ) as f:
-            raw_text = f.read()
+        raw_text = self.storage.read_text("excel/data_version.txt")
 
         if version_result := re.search(r"\d+\.\d+\.\d+", raw_text):
             version = version_result[0]
@@ -129,35 +448,6 @@ class Reader:
             date=date,
         )
 
-    def _read_excel_data(self, filename: str) -> Any:
-        """
-        Read data from `excel/{filename}.json`
-
-        :params filename: File name without `.json`
-
-        :return: `Any`
-        """
-        with (self.path / "excel" / (filename + ".json")).open(
-            "r", encoding="utf-8"
-        ) as f:
-            return json.load(f)
-
-    def _read_secondary_excel_data(self, filename: str) -> Any:
-        """
-        Read data from secondary `excel/{filename}.json`
-
-        :params filename: File name without `.json`
-
-        :return: `Any`
-        """
-        if self.secondary_path is None:
-            return None
-
-        with (self.secondary_path / "excel" / (filename + ".json")).open(
-            "r", encoding="utf-8"
-        ) as f:
-            return json.load(f)
-
     def _get_secondary_activity_name(self, activity_id: str) -> str:
         """
         Get secondary name for the activity
@@ -179,94 +469,289 @@ class Reader:
 
         :return: Secondary name, empty if not found
         """
-        if activity_id in self.secondary_story_review_table:
-            for story in self.secondary_story_review_table[activity_id][
-                "infoUnlockDatas"
-            ]:
-                if story["storyId"] == story_id:
-                    return story["storyName"]
+        if self.secondary_index is None:
+            return ""
+
+        story = self.secondary_index.story(activity_id, story_id)
+        if story is not None:
+            return story["storyName"]
         return ""
 
-    def _read_activities(self) -> list[Activity]:
+    def _read_story_info(self, story: dict[str, Any]) -> str:
         """
-        Read all activities except which of operators
+        Read `[uc]` info file of the story
+
+        :params story: story dict
 
-        :return: `list[Activity]`
+        :return: info text, empty if the story has no info
         """
-        activities: list[Activity] = []
+        if (
+            "storyInfo" in story
+            and story["storyInfo"] is not None
+            and story["storyInfo"] != ""
+        ):
+            info_path = "story/[uc]" + story["storyInfo"] + ".txt"
+            info = self._info_memo.get(info_path)
+            if info is not None:
+                self.deduplicated_reads += 1
+                return info
+
+            info = self._files.read_text(info_path).strip()
+            if self._is_shared(info_path):
+                self._info_memo[info_path] = info
+            return info
+        return ""
 
-        # for description
-        stage_table: dict[str, Any] = self._read_excel_data("stage_table")
+    def _story_file_hashes(self, stories: Iterable[dict[str, Any]]) -> dict[str, str]:
+        """
+        Hash story and info files of stories
 
-        for _, activity_data in self.story_review_table.items():
-            stories: list[AvgStory] = []
+        :params stories: story dicts
 
-            if (
-                activity_data["entryType"] == EntryType.NONE.value
-                and activity_data["actType"] == ActivityType.NONE.value
-            ):
-                continue
+        :return: hashes keyed by path relative to gamedata
+        """
+        hashes: dict[str, str] = {}
+        for story in stories:
+            for path in self._story_paths(story):
+                if path in hashes:
+                    continue
+                if path in self._hash_memo:
+                    self.deduplicated_reads += 1
+                else:
+                    # hashes are small, keep all of them
+                    self._hash_memo[path] = hash_data(self._files.read_bytes(path))
+                hashes[path] = self._hash_memo[path]
+        return hashes
+
+    def _activity_inputs(
+        self, activity_data: dict[str, Any], stage_table: dict[str, Any]
+    ) -> EntityInputs:
+        """
+        Collect inputs of the activity for incremental build
 
-            for story in activity_data["infoUnlockDatas"]:
-                story_path = self.path / f"story/{story['storyTxt']}.txt"
-                with story_path.open("r", encoding="utf-8") as f:
-                    texts = self._convert_story_text(f.read())
-
-                descriptions: list[str] = []
-                if "requiredStages" in story and story["requiredStages"] is not None:
-                    for stage in story["requiredStages"]:
-                        if (
-                            stage["stageId"] in stage_table["stages"]
-                            and "description" in stage_table["stages"][stage["stageId"]]
-                        ):
-                            desc: str = stage_table["stages"][stage["stageId"]][
-                                "description"
-                            ]
-                            if desc is not None:
-                                desc = desc.split("\\n")[0]
-                                descriptions.append(desc)
-
-                info: str = ""
-                if (
-                    "storyInfo" in story
-                    and story["storyInfo"] is not None
-                    and story["storyInfo"] != ""
-                ):
-                    info_path = (
-                        self.path / "story" / ("[uc]" + story["storyInfo"] + ".txt")
-                    )
-                    with info_path.open("r", encoding="utf-8") as f:
-                        info: str = f.read().strip()
-
-                stories.append(
-                    AvgStory(
-                        id=story["storyId"],
-                        name=story["storyName"],
-                        secondary_name=self._get_secondary_story_name(
-                            activity_data["id"], story["storyId"]
-                        ),
-                        code=story["storyCode"],
-                        avg_tag=story["avgTag"],
-                        description="\n".join(descriptions),
-                        info=info,
-                        texts=texts,
-                    )
+        :params activity_data: activity dict in `story_review_table`
+        :params stage_table: `stage_table`
+
+        :return: `EntityInputs`
+        """
+        activity_id: str = activity_data["id"]
+        inputs = EntityInputs()
+        inputs.rows[f"story_review_table/{activity_id}"] = hash_row(activity_data)
+        inputs.rows[f"secondary_story_review_table/{activity_id}"] = hash_row(
+            self.secondary_story_review_table.get(activity_id)
+        )
+        for story in activity_data["infoUnlockDatas"]:
+            for stage in story.get("requiredStages") or []:
+                inputs.rows[f"stage_table/stages/{stage['stageId']}"] = hash_row(
+                    stage_table["stages"].get(stage["stageId"])
                 )
+        inputs.files = self._story_file_hashes(activity_data["infoUnlockDatas"])
+        return inputs
+
+    def iter_activities(
+        self, activity_type: ActivityType | None = None
+    ) -> Iterator[Activity]:
+        """
+        Read activities except which of operators, one at a time,
+        only which match `book_filter` if set
 
-            activities.append(
-                Activity(
-                    id=activity_data["id"],
-                    name=activity_data["name"],
-                    secondary_name=self._get_secondary_activity_name(
-                        activity_data["id"]
-                    ),
-                    entry_type=EntryType(activity_data["entryType"]),
-                    activity_type=ActivityType(activity_data["actType"]),
-                    stories=stories,
+        :params activity_type: only read activities of this type, all if None
+
+        :return: `Iterator[Activity]`
+        """
+        if self.book_filter is not None and not self.book_filter.reads_activities:
+            return
+
+        self._prepare_memo()
+        # for description
+        stage_table: dict[str, Any] = self.index.table("stage_table")
+
+        activity_datas: list[dict[str, Any]] = [
+            activity_data
+            for activity_data in self.story_review_table.values()
+            if self._is_book_activity(activity_data)
+            and (
+                activity_type is None or activity_data["actType"] == activity_type.value
+            )
+            and (
+                self.book_filter is None
+                or self.book_filter.match_activity(activity_data)
+            )
+        ]
+
+        with self._worker_pool():
+            for batch in self._prefetched(
+                self._batches(activity_datas),
+                lambda batch: (
+                    story
+                    for activity_data in batch
+                    for story in activity_data["infoUnlockDatas"]
+                ),
+            ):
+                reused: dict[str, Activity] = {}
+                if self.build is not None:
+                    for activity_data in batch:
+                        activity = self.build.reuse(
+                            "activities",
+                            activity_data["id"],
+                            self._activity_inputs(activity_data, stage_table),
+                        )
+                        if activity is not None:
+                            reused[activity_data["id"]] = activity
+
+                story_texts = self._read_story_texts(
+                    story["storyTxt"]
+                    for activity_data in batch
+                    if activity_data["id"] not in reused
+                    for story in activity_data["infoUnlockDatas"]
                 )
+
+                for activity_data in batch:
+                    if activity_data["id"] in reused:
+                        yield reused[activity_data["id"]]
+                        continue
+
+                    activity = self._build_activity(
+                        activity_data, stage_table, story_texts
+                    )
+                    if self.build is not None and not self._has_diagnostics(
+                        story["storyTxt"] for story in activity_data["infoUnlockDatas"]
+                    ):
+                        self.build.record("activities", activity.id, activity)
+                    yield activity
+
+    @staticmethod
+    def _is_book_activity(activity_data: dict[str, Any]) -> bool:
+        """
+        Check whether the activity is read as activity, operator records
+        are read with their operators instead
+
+        :params activity_data: activity dict in `story_review_table`
+
+        :return: `bool`
+        """
+        return not (
+            activity_data["entryType"] == EntryType.NONE.value
+            and activity_data["actType"] == ActivityType.NONE.value
+        )
+
+    def get_activity(self, activity_id: str) -> Activity | None:
+        """
+        Read one activity, only its row and story files are read
+
+        :params activity_id: Id of activity
+
+        :return: `Activity` same as `iter_activities` gives,
+            None if not found or it is an operator record
+        """
+        activity_data = self.story_review_table.get(activity_id)
+        if activity_data is None or not self._is_book_activity(activity_data):
+            return None
+
+        story_texts = self._read_story_texts(
+            story["storyTxt"] for story in activity_data["infoUnlockDatas"]
+        )
+        return self._build_activity(
+            activity_data, self.index.table("stage_table"), story_texts
+        )
+
+    def get_story(self, story_id: str) -> AvgStory | None:
+        """
+        Read one story, only its rows and files are read
+
+        :params story_id: Id of story
+
+        :return: `AvgStory` same as in `Activity` or `Operator` of the full read,
+            None if not found
+        """
+        found = self.index.story_by_id(story_id)
+        if found is not None and self._is_book_activity(
+            self.story_review_table[found[0]]
+        ):
+            activity_id, story = found
+            texts = self._read_story_texts([story["storyTxt"]])[story["storyTxt"]]
+            return self._build_activity_story(
+                activity_id, story, self.index.table("stage_table"), texts
+            )
+
+        story = self.index.handbook_story(story_id)
+        if story is None:
+            return None
+        texts = self._read_story_texts([story["storyTxt"]])[story["storyTxt"]]
+        return self._build_operator_story(story, texts)
+
+    def _build_activity(
+        self,
+        activity_data: dict[str, Any],
+        stage_table: dict[str, Any],
+        story_texts: dict[str, list[ActorLine] | StoryText],
+    ) -> Activity:
+        """
+        Build activity from its data
+
+        :params activity_data: activity dict in `story_review_table`
+        :params stage_table: `stage_table`, for description
+        :params story_texts: converted texts keyed by `storyTxt`
+
+        :return: `Activity`
+        """
+        stories: list[AvgStory] = [
+            self._build_activity_story(
+                activity_data["id"], story, stage_table, story_texts[story["storyTxt"]]
             )
+            for story in activity_data["infoUnlockDatas"]
+        ]
+
+        return Activity(
+            id=activity_data["id"],
+            name=activity_data["name"],
+            secondary_name=self._get_secondary_activity_name(activity_data["id"]),
+            entry_type=EntryType(activity_data["entryType"]),
+            activity_type=ActivityType(activity_data["actType"]),
+            stories=stories,
+        )
+
+    def _build_activity_story(
+        self,
+        activity_id: str,
+        story: dict[str, Any],
+        stage_table: dict[str, Any],
+        texts: list[ActorLine] | StoryText,
+    ) -> AvgStory:
+        """
+        Build story of an activity from its data
+
+        :params activity_id: Id of activity
+        :params story: story dict in `story_review_table`
+        :params stage_table: `stage_table`, for description
+        :params texts: converted texts of the story
 
-        return activities
+        :return: `AvgStory`
+        """
+        descriptions: list[str] = []
+        if "requiredStages" in story and story["requiredStages"] is not None:
+            for stage in story["requiredStages"]:
+                if (
+                    stage["stageId"] in stage_table["stages"]
+                    and "description" in stage_table["stages"][stage["stageId"]]
+                ):
+                    desc: str = stage_table["stages"][stage["stageId"]]["description"]
+                    if desc is not None:
+                        desc = desc.split("\\n")[0]
+                        descriptions.append(desc)
+
+        return AvgStory(
+            id=story["storyId"],
+            name=story["storyName"],
+            secondary_name=self._get_secondary_story_name(
+                activity_id, story["storyId"]
+            ),
+            code=story["storyCode"],
+            avg_tag=story["avgTag"],
+            description="\n".join(descriptions),
+            info=self._read_story_info(story),
+            texts=texts,
+        )
 
     def _read_story_dict(
         self, activity_id: str, story_id: str
@@ -277,13 +762,9 @@ class Reader:
         :params activity_id: Id of activity
         :params story_id: Id of story
 
-        :return: `dict[str, Any]`, empty if not found
+        :return: `dict[str, Any]`, None if not found
         """
-        activity_data = self.story_review_table[activity_id]
-        for story in activity_data["infoUnlockDatas"]:
-            if story["storyId"] == story_id:
-                return story
-        return None
+        return self.index.story(activity_id, story_id)
 
     def _read_operator_voices(self, operator_id: str) -> list[Voice]:
         """
@@ -293,26 +774,10 @@ class Reader:
 
         :return: list[Voice]
         """
-        if getattr(self, "_charword_table", None) is None:
-            self._charword_table: dict[str, Any] = self._read_excel_data(
-                "charword_table"
-            )
-
-        # get all voices belonged to the operator
-        voices: dict[int, Voice] = {}
-        for _, data in self._charword_table["charWords"].items():
-            if data["charId"] == operator_id:
-                voices[data["voiceIndex"]] = Voice(
-                    title=data["voiceTitle"], text=data["voiceText"]
-                )
-
-        # sort by index
-        indexes: list[int] = sorted(voices.keys())
-        ret: list[Voice] = []
-        for i in indexes:
-            ret.append(voices[i])
-
-        return ret
+        return [
+            Voice(title=data["voiceTitle"], text=data["voiceText"])
+            for data in self.index.voices(operator_id)
+        ]
 
     def _read_operator_uniequips(self, operator_id: str) -> list[UniEquip]:
         """
@@ -322,194 +787,372 @@ class Reader:
 
         :return: list[UniEquip]
         """
-        if getattr(self, "_uniequip_table", None) is None:
-            self._uniequip_table: dict[str, Any] = self._read_excel_data(
-                "uniequip_table"
+        return [
+            UniEquip(
+                id=data["uniEquipId"],
+                type_name_1=data["typeName1"],
+                type_name_2=data["typeName2"],
+                name=data["uniEquipName"],
+                description=data["uniEquipDesc"],
             )
+            for data in self.index.uniequips(operator_id)
+        ]
 
-        # get all uniequips belonged to the operator
-        uniequips: dict[int, UniEquip] = {}
-        for _, data in self._uniequip_table["equipDict"].items():
-            if data["charId"] == operator_id:
-                uniequips[data["charEquipOrder"]] = UniEquip(
-                    id=data["uniEquipId"],
-                    type_name_1=data["typeName1"],
-                    type_name_2=data["typeName2"],
-                    name=data["uniEquipName"],
-                    description=data["uniEquipDesc"],
-                )
-
-        # sort by index
-        indexes: list[int] = sorted(uniequips.keys())
-        ret: list[UniEquip] = []
-        for i in indexes:
-            ret.append(uniequips[i])
+    def _operator_inputs(
+        self,
+        operator_id: str,
+        operator_data: dict[str, Any],
+        handbook_info_table: dict[str, Any],
+        handbook_team_table: dict[str, Any],
+        uniequip_table: dict[str, Any],
+    ) -> EntityInputs:
+        """
+        Collect inputs of the operator for incremental build
 
-        return ret
+        :params operator_id: operator id
+        :params operator_data: operator dict in `character_table`
+        :params handbook_info_table: `handbook_info_table`
+        :params handbook_team_table: `handbook_team_table`
+        :params uniequip_table: `uniequip_table`
 
-    def _read_operators(self) -> list[Operator]:
+        :return: `EntityInputs`
         """
-        Read all operator info and their stories
+        inputs = EntityInputs()
+        inputs.rows[f"character_table/{operator_id}"] = hash_row(operator_data)
 
-        :return: `list[Operator]`
-        """
+        sub_profession_id: str = operator_data["subProfessionId"]
+        inputs.rows[f"uniequip_table/subProfDict/{sub_profession_id}"] = hash_row(
+            uniequip_table["subProfDict"][sub_profession_id]
+        )
 
-        character_table: dict[str, Any] = self._read_excel_data("character_table")
-        handbook_info_table: dict[str, Any] = self._read_excel_data(
-            "handbook_info_table"
+        powers: list[dict[str, Any]] = [operator_data["mainPower"]]
+        powers += operator_data["subPower"] or []
+        for power in powers:
+            for power_id in (power["nationId"], power["groupId"], power["teamId"]):
+                if power_id is not None:
+                    inputs.rows[f"handbook_team_table/{power_id}"] = hash_row(
+                        handbook_team_table[power_id]
+                    )
+
+        inputs.rows[f"charword_table/charWords?charId={operator_id}"] = hash_row(
+            self.index.voices(operator_id)
         )
-        handbook_team_table: dict[str, Any] = self._read_excel_data(
-            "handbook_team_table"
+        inputs.rows[f"uniequip_table/equipDict?charId={operator_id}"] = hash_row(
+            self.index.uniequips(operator_id)
+        )
+
+        operator_handbook_info = handbook_info_table["handbookDict"].get(operator_id)
+        inputs.rows[f"handbook_info_table/handbookDict/{operator_id}"] = hash_row(
+            operator_handbook_info
         )
-        uniequip_table = self._read_excel_data("uniequip_table")
+        if operator_handbook_info is not None:
+            avg_stories: list[dict[str, Any]] = []
+            for operator_activity in operator_handbook_info["handbookAvgList"]:
+                story_set_id: str = operator_activity["storySetId"]
+                inputs.rows[f"story_review_table/{story_set_id}"] = hash_row(
+                    self.story_review_table.get(story_set_id)
+                )
+                inputs.rows[f"secondary_story_review_table/{story_set_id}"] = hash_row(
+                    self.secondary_story_review_table.get(story_set_id)
+                )
+                avg_stories += operator_activity["avgList"]
+            inputs.files = self._story_file_hashes(avg_stories)
+
+        return inputs
+
+    def iter_operators(self) -> Iterator[Operator]:
+        """
+        Read operator info and their stories, one at a time,
+        only which match `book_filter` if set
+
+        :return: `Iterator[Operator]`
+        """
+        if self.book_filter is not None and not self.book_filter.reads_operators:
+            return
+
+        self._prepare_memo()
+        character_table: dict[str, Any] = self.index.table("character_table")
+        handbook_info_table: dict[str, Any] = self.index.table("handbook_info_table")
+        handbook_team_table: dict[str, Any] = self.index.table("handbook_team_table")
+        uniequip_table: dict[str, Any] = self.index.table("uniequip_table")
 
-        operators: dict[str, Operator] = {}
         sort_table: list[str] = [""] * len(character_table)
         for operator_id, operator_data in character_table.items():
-            if operator_data["profession"] not in Profession:
+            if not self._is_book_operator(operator_data):
                 continue
 
-            if operator_data["name"].startswith("预备干员-"):
+            if self.book_filter is not None and not self.book_filter.match_operator(
+                operator_id, operator_data, handbook_team_table
+            ):
                 continue
 
             sort_table[operator_data["sortIndex"]] = operator_id
 
-            sub_profession: str = operator_data["subProfessionId"]
-            sub_profession = uniequip_table["subProfDict"][sub_profession][
-                "subProfessionName"
-            ]
-
-            main_nation_id: str | None = operator_data["mainPower"]["nationId"]
-            main_group_id: str | None = operator_data["mainPower"]["groupId"]
-            main_team_id: str | None = operator_data["mainPower"]["teamId"]
-            main_power = Power(
-                nation=handbook_team_table[main_nation_id]["powerName"]
-                if main_nation_id is not None
-                else None,
-                group=handbook_team_table[main_group_id]["powerName"]
-                if main_group_id is not None
-                else None,
-                team=handbook_team_table[main_team_id]["powerName"]
-                if main_team_id is not None
-                else None,
-            )
-
-            sub_powers: list[Power] | None = None
-            if operator_data["subPower"] is not None:
-                sub_powers = []
-                for p in operator_data["subPower"]:
-                    sub_nation_id: str | None = p["nationId"]
-                    sub_group_id: str | None = p["groupId"]
-                    sub_team_id: str | None = p["teamId"]
-
-                    sub_powers.append(
-                        Power(
-                            nation=handbook_team_table[sub_nation_id]["powerName"]
-                            if sub_nation_id is not None
-                            else None,
-                            group=handbook_team_table[sub_group_id]["powerName"]
-                            if sub_group_id is not None
-                            else None,
-                            team=handbook_team_table[sub_team_id]["powerName"]
-                            if sub_team_id is not None
-                            else None,
+        # sort operators
+        operator_ids: list[str] = [
+            operator_id for operator_id in sort_table if operator_id != ""
+        ]
+
+        with self._worker_pool():
+            for batch in self._prefetched(
+                self._batches(operator_ids),
+                lambda batch: (
+                    story
+                    for operator_id in batch
+                    for story in self._operator_stories(
+                        operator_id, handbook_info_table
+                    )
+                ),
+            ):
+                reused: dict[str, Operator] = {}
+                if self.build is not None:
+                    for operator_id in batch:
+                        operator = self.build.reuse(
+                            "operators",
+                            operator_id,
+                            self._operator_inputs(
+                                operator_id,
+                                character_table[operator_id],
+                                handbook_info_table,
+                                handbook_team_table,
+                                uniequip_table,
+                            ),
                         )
+                        if operator is not None:
+                            reused[operator_id] = operator
+
+                story_texts = self._read_story_texts(
+                    story_txt
+                    for operator_id in batch
+                    if operator_id not in reused
+                    for story_txt in self._operator_story_txts(
+                        operator_id, handbook_info_table
                     )
+                )
 
-            operator_stories: list[OperatorStory] = []
-            avgs: list[Activity] = []
-            if operator_id in handbook_info_table["handbookDict"]:
-                operator_handbook_info = handbook_info_table["handbookDict"][
-                    operator_id
-                ]
-                for story in operator_handbook_info["storyTextAudio"]:
-                    text: str = "\n".join(
-                        [line["storyText"] for line in story["stories"]]
+                for operator_id in batch:
+                    if operator_id in reused:
+                        yield reused[operator_id]
+                        continue
+
+                    operator = self._build_operator(
+                        operator_id,
+                        character_table[operator_id],
+                        handbook_info_table,
+                        handbook_team_table,
+                        uniequip_table,
+                        story_texts,
                     )
-                    operator_stories.append(
-                        OperatorStory(
-                            title=story["storyTitle"],
-                            text=text,
-                        )
+                    if self.build is not None and not self._has_diagnostics(
+                        self._operator_story_txts(operator_id, handbook_info_table)
+                    ):
+                        self.build.record("operators", operator_id, operator)
+                    yield operator
+
+    @staticmethod
+    def _is_book_operator(operator_data: dict[str, Any]) -> bool:
+        """
+        Check whether the character is read as operator
+
+        :params operator_data: character dict in `character_table`
+
+        :return: False for tokens, traps and reserve operators
+        """
+        return operator_data["profession"] in Profession and not operator_data[
+            "name"
+        ].startswith("预备干员-")
+
+    def get_operator(self, operator_id: str) -> Operator | None:
+        """
+        Read one operator, only its rows and story files are read
+
+        :params operator_id: operator id like `char_002_amiya`
+
+        :return: `Operator` same as `iter_operators` gives, None if not found
+        """
+        operator_data = self.index.table("character_table").get(operator_id)
+        if operator_data is None or not self._is_book_operator(operator_data):
+            return None
+
+        handbook_info_table: dict[str, Any] = self.index.table("handbook_info_table")
+        story_texts = self._read_story_texts(
+            self._operator_story_txts(operator_id, handbook_info_table)
+        )
+        return self._build_operator(
+            operator_id,
+            operator_data,
+            handbook_info_table,
+            self.index.table("handbook_team_table"),
+            self.index.table("uniequip_table"),
+            story_texts,
+        )
+
+    @staticmethod
+    def _operator_story_txts(
+        operator_id: str, handbook_info_table: dict[str, Any]
+    ) -> Iterator[str]:
+        """
+        Get `storyTxt` of all stories of an operator
+
+        :params operator_id: operator id
+        :params handbook_info_table: `handbook_info_table`
+
+        :return: `Iterator[str]`
+        """
+        for story in Reader._operator_stories(operator_id, handbook_info_table):
+            yield story["storyTxt"]
+
+    @staticmethod
+    def _operator_stories(
+        operator_id: str, handbook_info_table: dict[str, Any]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Get all story dicts of an operator
+
+        :params operator_id: operator id
+        :params handbook_info_table: `handbook_info_table`
+
+        :return: story dicts in `avgList`
+        """
+        if operator_id not in handbook_info_table["handbookDict"]:
+            return
+        for operator_activity in handbook_info_table["handbookDict"][operator_id][
+            "handbookAvgList"
+        ]:
+            yield from operator_activity["avgList"]
+
+    def _build_operator(
+        self,
+        operator_id: str,
+        operator_data: dict[str, Any],
+        handbook_info_table: dict[str, Any],
+        handbook_team_table: dict[str, Any],
+        uniequip_table: dict[str, Any],
+        story_texts: dict[str, list[ActorLine] | StoryText],
+    ) -> Operator:
+        """
+        Build operator from its data
+
+        :params operator_id: operator id
+        :params operator_data: operator dict in `character_table`
+        :params handbook_info_table: `handbook_info_table`
+        :params handbook_team_table: `handbook_team_table`
+        :params uniequip_table: `uniequip_table`
+        :params story_texts: converted texts keyed by `storyTxt`
+
+        :return: `Operator`
+        """
+        sub_profession: str = operator_data["subProfessionId"]
+        sub_profession = uniequip_table["subProfDict"][sub_profession][
+            "subProfessionName"
+        ]
+
+        main_nation_id: str | None = operator_data["mainPower"]["nationId"]
+        main_group_id: str | None = operator_data["mainPower"]["groupId"]
+        main_team_id: str | None = operator_data["mainPower"]["teamId"]
+        main_power = Power(
+            nation=handbook_team_table[main_nation_id]["powerName"]
+            if main_nation_id is not None
+            else None,
+            group=handbook_team_table[main_group_id]["powerName"]
+            if main_group_id is not None
+            else None,
+            team=handbook_team_table[main_team_id]["powerName"]
+            if main_team_id is not None
+            else None,
+        )
+
+        sub_powers: list[Power] | None = None
+        if operator_data["subPower"] is not None:
+            sub_powers = []
+            for p in operator_data["subPower"]:
+                sub_nation_id: str | None = p["nationId"]
+                sub_group_id: str | None = p["groupId"]
+                sub_team_id: str | None = p["teamId"]
+
+                sub_powers.append(
+                    Power(
+                        nation=handbook_team_table[sub_nation_id]["powerName"]
+                        if sub_nation_id is not None
+                        else None,
+                        group=handbook_team_table[sub_group_id]["powerName"]
+                        if sub_group_id is not None
+                        else None,
+                        team=handbook_team_table[sub_team_id]["powerName"]
+                        if sub_team_id is not None
+                        else None,
                     )
+                )
 
-                for operator_activity in operator_handbook_info["handbookAvgList"]:
-                    stories: list[AvgStory] = []
-                    for story in operator_activity["avgList"]:
-                        story_path = self.path / f"story/{story['storyTxt']}.txt"
-                        with story_path.open("r", encoding="utf-8") as f:
-                            texts = self._convert_story_text(f.read())
-
-                        info: str = ""
-                        if (
-                            "storyInfo" in story
-                            and story["storyInfo"] is not None
-                            and story["storyInfo"] != ""
-                        ):
-                            info_path = (
-                                self.path
-                                / "story"
-                                / ("[uc]" + story["storyInfo"] + ".txt")
-                            )
-                            with info_path.open("r", encoding="utf-8") as f:
-                                info: str = f.read().strip()
-
-                        story_dict = self._read_story_dict(
-                            story["storySetId"], story["storyId"]
-                        )
-                        stories.append(
-                            AvgStory(
-                                id=story["storyId"],
-                                name=story_dict["storyName"]
-                                if story_dict is not None
-                                else "",
-                                secondary_name=self._get_secondary_story_name(
-                                    story["storySetId"], story["storyId"]
-                                ),
-                                code=story_dict["storyCode"]
-                                if story_dict is not None
-                                else "",
-                                avg_tag=story_dict["avgTag"]
-                                if story_dict is not None
-                                else "",
-                                description=story["storyIntro"],
-                                info=info,
-                                texts=texts,
-                            )
-                        )
+        operator_stories: list[OperatorStory] = []
+        avgs: list[Activity] = []
+        if operator_id in handbook_info_table["handbookDict"]:
+            operator_handbook_info = handbook_info_table["handbookDict"][operator_id]
+            for story in operator_handbook_info["storyTextAudio"]:
+                text: str = "\n".join([line["storyText"] for line in story["stories"]])
+                operator_stories.append(
+                    OperatorStory(
+                        title=story["storyTitle"],
+                        text=text,
+                    )
+                )
 
-                    avgs.append(
-                        Activity(
-                            id=operator_activity["storySetId"],
-                            name=operator_activity["storySetName"],
-                            secondary_name=self._get_secondary_activity_name(
-                                operator_activity["storySetId"]
-                            ),
-                            entry_type=EntryType.NONE,
-                            activity_type=ActivityType.NONE,
-                            stories=stories,
-                        )
+            for operator_activity in operator_handbook_info["handbookAvgList"]:
+                stories: list[AvgStory] = [
+                    self._build_operator_story(story, story_texts[story["storyTxt"]])
+                    for story in operator_activity["avgList"]
+                ]
+
+                avgs.append(
+                    Activity(
+                        id=operator_activity["storySetId"],
+                        name=operator_activity["storySetName"],
+                        secondary_name=self._get_secondary_activity_name(
+                            operator_activity["storySetId"]
+                        ),
+                        entry_type=EntryType.NONE,
+                        activity_type=ActivityType.NONE,
+                        stories=stories,
                     )
+                )
 
-            operators[operator_id] = Operator(
-                id=operator_id,
-                name=operator_data["name"],
-                appellation=operator_data["appellation"],
-                usage=operator_data["itemUsage"] or "",
-                description=operator_data["itemDesc"] or "",
-                profession=Profession(operator_data["profession"]),
-                sub_profession=sub_profession,
-                operator_stories=operator_stories,
-                voices=self._read_operator_voices(operator_id),
-                avgs=avgs,
-                main_power=main_power,
-                sub_powers=sub_powers,
-                uniequips=self._read_operator_uniequips(operator_id),
-            )
+        return Operator(
+            id=operator_id,
+            name=operator_data["name"],
+            appellation=operator_data["appellation"],
+            usage=operator_data["itemUsage"] or "",
+            description=operator_data["itemDesc"] or "",
+            profession=Profession(operator_data["profession"]),
+            sub_profession=sub_profession,
+            operator_stories=operator_stories,
+            voices=self._read_operator_voices(operator_id),
+            avgs=avgs,
+            main_power=main_power,
+            sub_powers=sub_powers,
+            uniequips=self._read_operator_uniequips(operator_id),
+        )
 
-        # sort operators
-        sorted_operators: list[Operator] = []
-        for operator_id in sort_table:
-            if operator_id in operators:
-                sorted_operators.append(operators[operator_id])
-        return sorted_operators
+    def _build_operator_story(
+        self, story: dict[str, Any], texts: list[ActorLine] | StoryText
+    ) -> AvgStory:
+        """
+        Build story of an operator record from its data
+
+        :params story: story dict in `avgList` of `handbook_info_table`
+        :params texts: converted texts of the story
+
+        :return: `AvgStory`
+        """
+        story_dict = self._read_story_dict(story["storySetId"], story["storyId"])
+        return AvgStory(
+            id=story["storyId"],
+            name=story_dict["storyName"] if story_dict is not None else "",
+            secondary_name=self._get_secondary_story_name(
+                story["storySetId"], story["storyId"]
+            ),
+            code=story_dict["storyCode"] if story_dict is not None else "",
+            avg_tag=story_dict["avgTag"] if story_dict is not None else "",
+            description=story["storyIntro"],
+            info=self._read_story_info(story),
+            texts=texts,
+        )
@@ -0,0 +1,469 @@
+import json
+import struct
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from json.encoder import encode_basestring
+from typing import Any, BinaryIO, TextIO
+
+from .model import (
+    Activity,
+    ActorLine,
+    GameDataForBook,
+    GameDataMetadata,
+    Operator,
+    ScriptJsonEncoder,
+    StoryText,
+)
+
+
+def _backend_default(o: Any) -> Any:
+    if isinstance(o, StoryText):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+# native json encoders for minified output, in order of preference
+JSON_BACKENDS: tuple[str, ...] = ("orjson", "msgspec")
+
+
+def _load_backend(
+    names: Iterable[str] = JSON_BACKENDS,
+) -> Callable[[Any], bytes] | None:
+    """
+    Find an installed native json encoder for minified output
+
+    :params names: backends to try in order
+
+    :return: encode function, `None` if none of them is installed
+    """
+    for name in names:
+        try:
+            if name == "orjson":
+                import orjson  # type: ignore
+
+                return lambda o: orjson.dumps(o, default=_backend_default)
+            if name == "msgspec":
+                import msgspec  # type: ignore
+
+                return msgspec.json.Encoder(enc_hook=_backend_default).encode
+        except ImportError:
+            continue
+        raise ValueError(f"Unknown json backend: {name}")
+    return None
+
+
+class JsonSerializer:
+    """
+    Serialize models to json by walking their fields directly, without
+    `asdict` copies or intermediate dicts
+
+    Output is the same as `json.dumps(o, ensure_ascii=False,
+    cls=ScriptJsonEncoder)`, with `minify` the same as with separators
+    `(",", ":")`. Strings are escaped by the C encoder of `json`, speakers
+    of a `StoryText` once per story.
+
+    With `minify`, entities are encoded by orjson or msgspec if installed,
+    byte for byte the same except floats and invalid values like `NaN`.
+    They only write compact separators, so the default output is always
+    encoded here.
+    """
+
+    def __init__(self, minify: bool = False) -> None:
+        self.minify = minify
+        if minify:
+            self._item_separator, self._key_separator = ",", ":"
+            self._backend = _load_backend()
+        else:
+            self._item_separator, self._key_separator = ", ", ": "
+            self._backend = None
+        # attribute and key prefix of each field, per dataclass
+        self._fields: dict[type, list[tuple[str, str]]] = {}
+
+    def _dataclass_fields(self, cls: type) -> list[tuple[str, str]]:
+        prefixes = self._fields.get(cls)
+        if prefixes is None:
+            prefixes = [
+                (
+                    field.name,
+                    ("{" if i == 0 else self._item_separator)
+                    + encode_basestring(field.name)
+                    + self._key_separator,
+                )
+                for i, field in enumerate(fields(cls))
+            ]
+            self._fields[cls] = prefixes
+        return prefixes
+
+    def _encode(self, o: Any, parts: list[str]) -> None:
+        """
+        Append json of a value
+
+        :params o: model, list, enum or json value
+        :params parts: json chunks, joined in order
+        """
+        cls = type(o)
+        if cls is str:
+            parts.append(encode_basestring(o))
+            return
+        prefixes = self._fields.get(cls)
+        if prefixes is not None:
+            if not prefixes:
+                parts.append("{}")
+                return
+            for name, prefix in prefixes:
+                parts.append(prefix)
+                value = getattr(o, name)
+                if type(value) is str:
+                    parts.append(encode_basestring(value))
+                elif value is None:
+                    parts.append("null")
+                else:
+                    self._encode(value, parts)
+            parts.append("}")
+        elif cls is list:
+            if not o:
+                parts.append("[]")
+                return
+            separator = "["
+            for item in o:
+                parts.append(separator)
+                separator = self._item_separator
+                self._encode(item, parts)
+            parts.append("]")
+        elif o is None:
+            parts.append("null")
+        elif cls is StoryText:
+            self._encode_story_text(o, parts)
+        elif isinstance(o, Enum):
+            self._encode(o.value, parts)
+        elif is_dataclass(o) and not isinstance(o, type):
+            self._dataclass_fields(cls)
+            self._encode(o, parts)
+        else:
+            # numbers, dicts and tuples are rare in models
+            parts.append(
+                json.dumps(
+                    o,
+                    ensure_ascii=False,
+                    cls=ScriptJsonEncoder,
+                    separators=(self._item_separator, self._key_separator),
+                )
+            )
+
+    def _encode_story_text(self, texts: StoryText, parts: list[str]) -> None:
+        if len(texts) == 0:
+            parts.append("[]")
+            return
+
+        (name_field, name_prefix), (text_field, text_prefix) = self._dataclass_fields(
+            ActorLine
+        )
+        assert (name_field, text_field) == ("name", "text")
+        speakers: list[str] = []
+        for speaker in texts._speakers:
+            speaker_parts = [name_prefix]
+            self._encode(speaker, speaker_parts)
+            speaker_parts.append(text_prefix)
+            speakers.append("".join(speaker_parts))
+
+        text = texts._text
+        offsets = texts._offsets
+        parts.append("[")
+        parts.append(
+            self._item_separator.join(
+                [
+                    speakers[speaker_id]
+                    + encode_basestring(text[offsets[i] : offsets[i + 1]])
+                    + "}"
+                    for i, speaker_id in enumerate(texts._speaker_ids)
+                ]
+            )
+        )
+        parts.append("]")
+
+    def dumps(self, o: Any) -> str:
+        """
+        Serialize a model
+
+        :params o: model, like `Activity` or `Operator`
+
+        :return: json
+        """
+        if self._backend is not None:
+            return self._backend(o).decode("utf-8")
+        parts: list[str] = []
+        self._encode(o, parts)
+        return "".join(parts)
+
+    def iter_book(
+        self,
+        metadata: GameDataMetadata,
+        activities: Iterable[Activity],
+        operators: Iterable[Operator],
+    ) -> Iterator[str]:
+        """
+        Serialize game data one entity at a time, same as `GameDataForBook`
+
+        :params metadata: game data metadata
+        :params activities: activities, consumed one at a time
+        :params operators: operators, consumed one at a time
+
+        :return: json chunks, at most one entity each
+        """
+        item_separator = self._item_separator
+        key_separator = self._key_separator
+        yield '{"metadata"' + key_separator
+        yield self.dumps(metadata)
+        for key, entities in (("activities", activities), ("operators", operators)):
+            yield item_separator + encode_basestring(key) + key_separator + "["
+            for i, entity in enumerate(entities):
+                if i > 0:
+                    yield item_separator
+                yield self.dumps(entity)
+            yield "]"
+        yield "}"
+
+    def dump_book(
+        self,
+        f: TextIO,
+        metadata: GameDataMetadata,
+        activities: Iterable[Activity],
+        operators: Iterable[Operator],
+    ) -> None:
+        """
+        Write game data as json one entity at a time
+
+        :params f: output file
+        :params metadata: game data metadata
+        :params activities: activities
+        :params operators: operators
+        """
+        for chunk in self.iter_book(metadata, activities, operators):
+            f.write(chunk)
+
+    def dump(self, data: GameDataForBook, f: TextIO) -> None:
+        """
+        Write read game data as json
+
+        :params data: game data
+        :params f: output file
+        """
+        self.dump_book(f, data.metadata, data.activities, data.operators)
+
+
+# major types of cbor data items
+_CBOR_UNSIGNED = 0
+_CBOR_NEGATIVE = 1
+_CBOR_TEXT = 3
+_CBOR_ARRAY = 4
+_CBOR_MAP = 5
+
+_CBOR_FALSE = b"\xf4"
+_CBOR_TRUE = b"\xf5"
+_CBOR_NULL = b"\xf6"
+_CBOR_FLOAT = b"\xfb"
+_CBOR_INDEFINITE_ARRAY = b"\x9f"
+_CBOR_BREAK = b"\xff"
+
+
+def _cbor_head(major: int, argument: int) -> bytes:
+    """
+    Encode initial bytes of a data item
+
+    :params major: major type
+    :params argument: length or value, fitting in 64 bits
+
+    :return: initial byte with following argument bytes
+    """
+    if argument < 24:
+        return bytes((major << 5 | argument,))
+    if argument < 0x100:
+        return bytes((major << 5 | 24, argument))
+    if argument < 0x10000:
+        return bytes((major << 5 | 25,)) + argument.to_bytes(2, "big")
+    if argument < 0x100000000:
+        return bytes((major << 5 | 26,)) + argument.to_bytes(4, "big")
+    return bytes((major << 5 | 27,)) + argument.to_bytes(8, "big")
+
+
+# heads of short strings, most keys and names
+_CBOR_TEXT_HEADS = [_cbor_head(_CBOR_TEXT, length) for length in range(0x100)]
+
+
+def _cbor_text(s: str) -> bytes:
+    data = s.encode("utf-8")
+    length = len(data)
+    if length < 0x100:
+        return _CBOR_TEXT_HEADS[length] + data
+    return _cbor_head(_CBOR_TEXT, length) + data
+
+
+class CborSerializer:
+    """
+    Serialize models to CBOR (RFC 8949) with the same structure as
+    `JsonSerializer`, for typst to load without parsing json
+
+    Models are maps with keys in field order, enums are their values and
+    `StoryText` an array of `ActorLine` maps. Arrays of a book are of
+    indefinite length, so entities are written as they are read.
+    """
+
+    def __init__(self) -> None:
+        # map head with attribute and encoded key of each field, per dataclass
+        self._fields: dict[type, tuple[bytes, list[tuple[str, bytes]]]] = {}
+
+    def _dataclass_fields(self, cls: type) -> tuple[bytes, list[tuple[str, bytes]]]:
+        prefixes = self._fields.get(cls)
+        if prefixes is None:
+            keys = [(field.name, _cbor_text(field.name)) for field in fields(cls)]
+            prefixes = _cbor_head(_CBOR_MAP, len(keys)), keys
+            self._fields[cls] = prefixes
+        return prefixes
+
+    def _encode(self, o: Any, parts: list[bytes]) -> None:
+        """
+        Append CBOR of a value
+
+        :params o: model, list, enum or json value
+        :params parts: CBOR chunks, joined in order
+        """
+        cls = type(o)
+        if cls is str:
+            parts.append(_cbor_text(o))
+            return
+        prefixes = self._fields.get(cls)
+        if prefixes is not None:
+            head, keys = prefixes
+            parts.append(head)
+            for name, key in keys:
+                parts.append(key)
+                value = getattr(o, name)
+                if type(value) is str:
+                    parts.append(_cbor_text(value))
+                elif value is None:
+                    parts.append(_CBOR_NULL)
+                else:
+                    self._encode(value, parts)
+        elif cls is list or cls is tuple:
+            parts.append(_cbor_head(_CBOR_ARRAY, len(o)))
+            for item in o:
+                self._encode(item, parts)
+        elif o is None:
+            parts.append(_CBOR_NULL)
+        elif cls is StoryText:
+            self._encode_story_text(o, parts)
+        elif isinstance(o, Enum):
+            self._encode(o.value, parts)
+        elif is_dataclass(o) and not isinstance(o, type):
+            self._dataclass_fields(cls)
+            self._encode(o, parts)
+        elif isinstance(o, str):
+            parts.append(_cbor_text(o))
+        elif isinstance(o, bool):
+            parts.append(_CBOR_TRUE if o else _CBOR_FALSE)
+        elif isinstance(o, int):
+            if o >= 0:
+                parts.append(_cbor_head(_CBOR_UNSIGNED, o))
+            else:
+                parts.append(_cbor_head(_CBOR_NEGATIVE, -1 - o))
+        elif isinstance(o, float):
+            parts.append(_CBOR_FLOAT + struct.pack(">d", o))
+        elif isinstance(o, dict):
+            parts.append(_cbor_head(_CBOR_MAP, len(o)))
+            for key, value in o.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"keys must be str, not {type(key).__name__}")
+                parts.append(_cbor_text(key))
+                self._encode(value, parts)
+        else:
+            raise TypeError(
+                f"Object of type {type(o).__name__} is not CBOR serializable"
+            )
+
+    def _encode_story_text(self, texts: StoryText, parts: list[bytes]) -> None:
+        head, ((name_field, name_key), (text_field, text_key)) = self._dataclass_fields(
+            ActorLine
+        )
+        assert (name_field, text_field) == ("name", "text")
+        speakers: list[bytes] = []
+        for speaker in texts._speakers:
+            speaker_parts = [head, name_key]
+            self._encode(speaker, speaker_parts)
+            speaker_parts.append(text_key)
+            speakers.append(b"".join(speaker_parts))
+
+        text = texts._text
+        offsets = texts._offsets
+        parts.append(_cbor_head(_CBOR_ARRAY, len(texts)))
+        parts.append(
+            b"".join(
+                [
+                    speakers[speaker_id] + _cbor_text(text[offsets[i] : offsets[i + 1]])
+                    for i, speaker_id in enumerate(texts._speaker_ids)
+                ]
+            )
+        )
+
+    def dumps(self, o: Any) -> bytes:
+        """
+        Serialize a model
+
+        :params o: model, like `Activity` or `Operator`
+
+        :return: CBOR
+        """
+        parts: list[bytes] = []
+        self._encode(o, parts)
+        return b"".join(parts)
+
+    def iter_book(
+        self,
+        metadata: GameDataMetadata,
+        activities: Iterable[Activity],
+        operators: Iterable[Operator],
+    ) -> Iterator[bytes]:
+        """
+        Serialize game data one entity at a time, same structure as
+        `GameDataForBook`
+
+        :params metadata: game data metadata
+        :params activities: activities, consumed one at a time
+        :params operators: operators, consumed one at a time
+
+        :return: CBOR chunks, at most one entity each
+        """
+        yield _cbor_head(_CBOR_MAP, 3) + _cbor_text("metadata")
+        yield self.dumps(metadata)
+        for key, entities in (("activities", activities), ("operators", operators)):
+            yield _cbor_text(key) + _CBOR_INDEFINITE_ARRAY
+            for entity in entities:
+                yield self.dumps(entity)
+            yield _CBOR_BREAK
+
+    def dump_book(
+        self,
+        f: BinaryIO,
+        metadata: GameDataMetadata,
+        activities: Iterable[Activity],
+        operators: Iterable[Operator],
+    ) -> None:
+        """
+        Write game data as CBOR one entity at a time
+
+        :params f: output file, opened in binary mode
+        :params metadata: game data metadata
+        :params activities: activities
+        :params operators: operators
+        """
+        for chunk in self.iter_book(metadata, activities, operators):
+            f.write(chunk)
+
+    def dump(self, data: GameDataForBook, f: BinaryIO) -> None:
+        """
+        Write read game data as CBOR
+
+        :params data: game data
+        :params f: output file, opened in binary mode
+        """
+        self.dump_book(f, data.metadata, data.activities, data.operators)
@@ -0,0 +1,578 @@
+import mmap
+import os
+import struct
+import subprocess
+import tarfile
+import tempfile
+import threading
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+# file every gamedata root contains, used to find the root in archives
+ROOT_MARKER = "excel/story_review_table.json"
+PACK_SUFFIX = ".tbpack"
+
+
+def decode_text(raw_data: bytes) -> str:
+    """
+    Decode text file like `open` in text mode, with universal newlines
+
+    :params raw_data: raw bytes
+
+    :return: decoded text
+    """
+    return raw_data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _find_root(names: Iterable[str], root: str | None) -> str:
+    """
+    Find gamedata root among file names of an archive
+
+    :params names: file names in archive
+    :params root: root given by user, detect if None
+
+    :return: root prefix ending with `/`, empty if at top level
+    """
+    if root is not None:
+        root = root.strip("/")
+        return root + "/" if root != "" else ""
+
+    roots = sorted(
+        name[: -len(ROOT_MARKER)]
+        for name in names
+        if name == ROOT_MARKER or name.endswith("/" + ROOT_MARKER)
+    )
+    if len(roots) == 0:
+        raise FileNotFoundError(f"Cannot find gamedata root with {ROOT_MARKER}")
+    if len(roots) > 1:
+        raise ValueError(
+            "Multiple gamedata roots found, specify one of: "
+            + ", ".join(r.rstrip("/") for r in roots)
+        )
+    return roots[0]
+
+
+class Storage(ABC):
+    """
+    Read-only access to files of a gamedata tree, by `/` separated paths
+    relative to gamedata root like `excel/stage_table.json`
+
+    Reads may run concurrently from several threads.
+    """
+
+    @abstractmethod
+    def read_bytes(self, path: str) -> bytes:
+        """
+        Read file content
+
+        :params path: path relative to gamedata root
+
+        :return: file content
+        """
+
+    @abstractmethod
+    def names(self) -> Iterator[str]:
+        """
+        List files
+
+        :return: paths relative to gamedata root
+        """
+
+    def stat(self, path: str) -> tuple[int, int] | None:
+        """
+        Get size and mtime of a file without reading it, to tell whether
+        the file changed since last read
+
+        :params path: path relative to gamedata root
+
+        :return: size and mtime in nanoseconds, None if storage cannot tell
+        """
+        return None
+
+    def content_id(self, path: str) -> str | None:
+        """
+        Get an id of file content without reading it, the same id always
+        means the same content, like a git blob id
+
+        :params path: path relative to gamedata root
+
+        :return: content id, None if storage cannot tell
+        """
+        return None
+
+    def read_text(self, path: str) -> str:
+        """
+        Read text file as utf-8, with universal newlines
+
+        :params path: path relative to gamedata root
+
+        :return: file content
+        """
+        return decode_text(self.read_bytes(path))
+
+
+class DirectoryStorage(Storage):
+    """
+    Extracted gamedata directory
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        return (self.path / path).read_bytes()
+
+    def stat(self, path: str) -> tuple[int, int] | None:
+        stat = (self.path / path).stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def names(self) -> Iterator[str]:
+        for file_path in self.path.rglob("*"):
+            if file_path.is_file():
+                yield file_path.relative_to(self.path).as_posix()
+
+    def __repr__(self) -> str:
+        return f"DirectoryStorage({str(self.path)!r})"
+
+
+class ZipStorage(Storage):
+    """
+    Gamedata in a `.zip` archive
+    """
+
+    def __init__(self, path: str | Path, root: str | None = None) -> None:
+        self.path = Path(path)
+        self._zip: zipfile.ZipFile | None = None
+        self._mtime_ns = 0
+        self._pid: int | None = None
+        self.root = _find_root(self._open().namelist(), root)
+
+    def _open(self) -> zipfile.ZipFile:
+        # file handle is not shared with forked worker processes
+        if self._zip is None or self._pid != os.getpid():
+            self._zip = zipfile.ZipFile(self.path)
+            assert self._zip.fp is not None
+            # time of the opened archive, the path may be replaced later
+            self._mtime_ns = os.fstat(self._zip.fp.fileno()).st_mtime_ns
+            self._pid = os.getpid()
+        return self._zip
+
+    def read_bytes(self, path: str) -> bytes:
+        try:
+            return self._open().read(self.root + path)
+        except KeyError:
+            raise FileNotFoundError(f"{self.path}: {self.root + path}") from None
+
+    def stat(self, path: str) -> tuple[int, int] | None:
+        try:
+            info = self._open().getinfo(self.root + path)
+        except KeyError:
+            raise FileNotFoundError(f"{self.path}: {self.root + path}") from None
+        # member times are only accurate to 2 seconds, use time of the archive
+        return info.file_size, self._mtime_ns
+
+    def names(self) -> Iterator[str]:
+        for name in self._open().namelist():
+            if name.startswith(self.root) and not name.endswith("/"):
+                yield name[len(self.root) :]
+
+    def __getstate__(self) -> dict[str, Any]:
+        # reopen in worker processes
+        state = self.__dict__.copy()
+        state["_zip"] = None
+        return state
+
+    def __repr__(self) -> str:
+        return f"ZipStorage({str(self.path)!r}, root={self.root!r})"
+
+
+class TarStorage(Storage):
+    """
+    Gamedata in a `.tar`, `.tar.gz` or `.tar.zst` archive
+
+    Compressed tar has no random access, so `excel` and `story` files of the
+    root are decompressed into memory in one sequential pass on first read.
+    """
+
+    KEPT_DIRECTORIES = ("excel/", "story/")
+
+    def __init__(self, path: str | Path, root: str | None = None) -> None:
+        self.path = Path(path)
+        self._root = root
+        self._files: dict[str, bytes] | None = None
+        self._lock = threading.Lock()
+
+    def _open_stream(self) -> IO[bytes]:
+        name = self.path.name.lower()
+        if name.endswith((".tar.zst", ".tzst")):
+            try:
+                from compression import zstd  # type: ignore
+
+                return zstd.open(self.path, "rb")
+            except ImportError:
+                pass
+            try:
+                import zstandard  # type: ignore
+            except ImportError:
+                raise ImportError(
+                    "zstandard is required to read .tar.zst gamedata"
+                ) from None
+            return zstandard.ZstdDecompressor().stream_reader(self.path.open("rb"))
+        if name.endswith((".tar.gz", ".tgz")):
+            import gzip
+
+            return gzip.open(self.path, "rb")
+        return self.path.open("rb")
+
+    def _load(self) -> dict[str, bytes]:
+        if self._files is not None:
+            return self._files
+        with self._lock:
+            if self._files is None:
+                self._files = self._extract()
+            return self._files
+
+    def _extract(self) -> dict[str, bytes]:
+        prefix = _find_root([], self._root) if self._root is not None else None
+        files: dict[str, bytes] = {}
+        with (
+            self._open_stream() as stream,
+            tarfile.open(fileobj=stream, mode="r|") as tar,
+        ):
+            for member in tar:
+                name = member.name.removeprefix("./")
+                if not member.isfile():
+                    continue
+                if prefix is not None:
+                    relative = name[len(prefix) :]
+                    if not name.startswith(prefix) or not relative.startswith(
+                        self.KEPT_DIRECTORIES
+                    ):
+                        continue
+                elif not any("/" + d in "/" + name for d in self.KEPT_DIRECTORIES):
+                    continue
+
+                f = tar.extractfile(member)
+                if f is not None:
+                    files[name] = f.read()
+
+        if prefix is None:
+            prefix = _find_root(files.keys(), None)
+        return {
+            name[len(prefix) :]: data
+            for name, data in files.items()
+            if name.startswith(prefix)
+            and name[len(prefix) :].startswith(self.KEPT_DIRECTORIES)
+        }
+
+    def read_bytes(self, path: str) -> bytes:
+        try:
+            return self._load()[path]
+        except KeyError:
+            raise FileNotFoundError(f"{self.path}: {path}") from None
+
+    def names(self) -> Iterator[str]:
+        yield from self._load()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # extract again in worker processes instead of pickling the archive
+        state = self.__dict__.copy()
+        state["_files"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"TarStorage({str(self.path)!r}, root={self._root!r})"
+
+
+class GitStorage(Storage):
+    """
+    Gamedata at a revision of a local git repository, blobs are read with
+    `git cat-file` without checkout
+    """
+
+    def __init__(
+        self,
+        git_dir: str | Path,
+        revision: str = "HEAD",
+        root: str | None = None,
+    ) -> None:
+        self.git_dir = Path(git_dir)
+        self.revision = revision
+        self.commit = self._git("rev-parse", "--verify", revision + "^{commit}")
+        self.commit = self.commit.strip()
+        self._process: subprocess.Popen[bytes] | None = None
+        self._pid: int | None = None
+        # one request at a time on the `git cat-file` pipe
+        self._lock = threading.Lock()
+        self._blobs: dict[str, str] = {}
+
+        names: dict[str, str] = {}
+        output = self._git("ls-tree", "-r", "-z", "--full-tree", self.commit)
+        for entry in output.split("\0"):
+            if entry == "":
+                continue
+            info, name = entry.split("\t", 1)
+            _, object_type, object_id = info.split(" ")
+            if object_type == "blob":
+                names[name] = object_id
+
+        self.root = _find_root(names.keys(), root)
+        self._blobs = {
+            name[len(self.root) :]: object_id
+            for name, object_id in names.items()
+            if name.startswith(self.root)
+        }
+
+    def _git(self, *args: str) -> str:
+        return subprocess.run(
+            ["git", "--git-dir", str(self.git_dir), *args],
+            check=True,
+            capture_output=True,
+        ).stdout.decode("utf-8")
+
+    def _cat_file(self) -> subprocess.Popen[bytes]:
+        # pipes are not shared with forked worker processes
+        if self._process is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._process = subprocess.Popen(
+                ["git", "--git-dir", str(self.git_dir), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        return self._process
+
+    def read_bytes(self, path: str) -> bytes:
+        if path not in self._blobs:
+            raise FileNotFoundError(f"{self.git_dir}@{self.revision}: {path}")
+
+        with self._lock:
+            process = self._cat_file()
+            assert process.stdin is not None and process.stdout is not None
+            object_id = self._blobs[path]
+            process.stdin.write(object_id.encode("ascii") + b"\n")
+            process.stdin.flush()
+
+            header = process.stdout.readline().split()
+            if len(header) != 3 or header[1] != b"blob":
+                # `<id> missing` in partial clones, nothing if git exited
+                raise FileNotFoundError(
+                    f"{self.git_dir}@{self.revision}: {path}, cannot read blob "
+                    f"{object_id}: {b' '.join(header).decode(errors='replace')}"
+                )
+            size = int(header[2])
+            data = process.stdout.read(size)
+            process.stdout.read(1)  # trailing newline
+        if len(data) != size:
+            raise OSError(
+                f"{self.git_dir}@{self.revision}: {path}, blob {object_id} truncated"
+            )
+        return data
+
+    def content_id(self, path: str) -> str | None:
+        if path not in self._blobs:
+            raise FileNotFoundError(f"{self.git_dir}@{self.revision}: {path}")
+        return "git-blob:" + self._blobs[path]
+
+    def names(self) -> Iterator[str]:
+        yield from self._blobs
+
+    def __getstate__(self) -> dict[str, Any]:
+        # start own `git cat-file` in worker processes
+        state = self.__dict__.copy()
+        state["_process"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __del__(self) -> None:
+        if (
+            getattr(self, "_process", None) is not None
+            and getattr(self, "_pid", None) == os.getpid()
+        ):
+            assert self._process is not None
+            if self._process.stdin is not None:
+                self._process.stdin.close()
+            self._process.wait()
+
+    def __repr__(self) -> str:
+        return (
+            f"GitStorage({str(self.git_dir)!r}, {self.revision!r}, root={self.root!r})"
+        )
+
+
+class PackStorage(Storage):
+    """
+    Gamedata packed by `write_pack` into one file, memory-mapped and
+    read by offset index, files are sliced from the mapping on demand
+
+    Layout: header (magic, index offset, file count), file contents one
+    after another, then index entries (offset, size, path length, path).
+    """
+
+    MAGIC = b"TBPACK\x00\x01"
+    HEADER = struct.Struct("<8sQQ")
+    ENTRY = struct.Struct("<QQH")
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._mmap: mmap.mmap | None = None
+        self._mtime_ns = 0
+        self._pid: int | None = None
+        self._index = self._read_index(self._open())
+
+    def _open(self) -> mmap.mmap:
+        # mapping is not shared with forked worker processes
+        if self._mmap is None or self._pid != os.getpid():
+            with self.path.open("rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                # time of the mapped pack, the path may be replaced later
+                self._mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            if hasattr(mmap, "MADV_WILLNEED"):
+                # read ahead the whole pack instead of faulting in each file
+                self._mmap.madvise(mmap.MADV_WILLNEED)
+            self._pid = os.getpid()
+        return self._mmap
+
+    def _read_index(self, data: mmap.mmap) -> dict[str, tuple[int, int]]:
+        if len(data) < self.HEADER.size:
+            raise ValueError(f"Not a gamedata pack: {self.path}")
+        magic, index_offset, count = self.HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"Not a gamedata pack: {self.path}")
+
+        index: dict[str, tuple[int, int]] = {}
+        position = index_offset
+        for _ in range(count):
+            offset, size, path_size = self.ENTRY.unpack_from(data, position)
+            position += self.ENTRY.size
+            name = data[position : position + path_size].decode("utf-8")
+            position += path_size
+            index[name] = (offset, size)
+        return index
+
+    def read_bytes(self, path: str) -> bytes:
+        try:
+            offset, size = self._index[path]
+        except KeyError:
+            raise FileNotFoundError(f"{self.path}: {path}") from None
+        return self._open()[offset : offset + size]
+
+    def stat(self, path: str) -> tuple[int, int] | None:
+        try:
+            _, size = self._index[path]
+        except KeyError:
+            raise FileNotFoundError(f"{self.path}: {path}") from None
+        self._open()
+        return size, self._mtime_ns
+
+    def names(self) -> Iterator[str]:
+        yield from self._index
+
+    def __getstate__(self) -> dict[str, Any]:
+        # map again in worker processes
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
+
+    def __repr__(self) -> str:
+        return f"PackStorage({str(self.path)!r})"
+
+
+def write_pack(
+    storage: Storage,
+    pack_path: str | Path,
+    directories: tuple[str, ...] = TarStorage.KEPT_DIRECTORIES,
+) -> int:
+    """
+    Pack gamedata files into one file for `PackStorage`
+
+    :params storage: gamedata storage to pack
+    :params pack_path: output file
+    :params directories: only pack files under these directories
+
+    :return: number of packed files
+    """
+    pack_path = Path(pack_path)
+    names = sorted(name for name in storage.names() if name.startswith(directories))
+
+    entries: list[tuple[int, int, bytes]] = []
+    fd, tmp_path = tempfile.mkstemp(dir=pack_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(PackStorage.HEADER.pack(PackStorage.MAGIC, 0, 0))
+            offset = PackStorage.HEADER.size
+            for name in names:
+                data = storage.read_bytes(name)
+                f.write(data)
+                entries.append((offset, len(data), name.encode("utf-8")))
+                offset += len(data)
+
+            for entry_offset, size, encoded_name in entries:
+                f.write(PackStorage.ENTRY.pack(entry_offset, size, len(encoded_name)))
+                f.write(encoded_name)
+            f.seek(0)
+            f.write(PackStorage.HEADER.pack(PackStorage.MAGIC, offset, len(entries)))
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return len(entries)
+
+
+def _is_git_dir(path: Path) -> bool:
+    return (
+        (path / "HEAD").is_file()
+        and (path / "objects").is_dir()
+        and (path / "refs").is_dir()
+    )
+
+
+def open_storage(
+    path: str | Path,
+    revision: str | None = None,
+    root: str | None = None,
+) -> Storage:
+    """
+    Open gamedata storage by path
+
+    :params path: gamedata directory, `.zip`, `.tar(.gz|.zst)`, `.tbpack`
+        or git repository
+    :params revision: git revision, only for git repository
+    :params root: gamedata root inside archive or repository, detect if None
+
+    :return: `Storage`
+    """
+    path = Path(path)
+    name = path.name.lower()
+
+    if not path.exists():
+        raise FileNotFoundError(f"Gamedata not found: {path}")
+    if path.is_dir():
+        if _is_git_dir(path):
+            return GitStorage(path, revision or "HEAD", root)
+        if revision is not None:
+            if _is_git_dir(path / ".git"):
+                return GitStorage(path / ".git", revision, root)
+            raise ValueError(f"Revision is only supported for git repository: {path}")
+        return DirectoryStorage(path / root if root else path)
+
+    if revision is not None:
+        raise ValueError(f"Revision is only supported for git repository: {path}")
+    if name.endswith(".zip"):
+        return ZipStorage(path, root)
+    if name.endswith(PACK_SUFFIX):
+        return PackStorage(path)
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.zst", ".tzst")):
+        return TarStorage(path, root)
+    raise ValueError(f"Unsupported gamedata storage: {path}")
@@ -1,23 +1,62 @@
-import json
+import os
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
 from enum import Enum
 from pathlib import Path
-from typing import Annotated
+from typing import IO, Annotated
 
 import typer
 from tqdm import tqdm, trange
 
 from .comic import Comic
 from .epub import EpubGenerator
-from .gamedata import Reader, ScriptJsonEncoder
-from .txt import generate_txt
+from .gamedata import (
+    ActivityType,
+    BookFilter,
+    BuildManifest,
+    CborSerializer,
+    EntryType,
+    JsonSerializer,
+    Profession,
+    Reader,
+    StoryCache,
+    TableCache,
+    open_storage,
+    write_pack,
+)
+from .shard import ShardWriter, iter_json_shards, iter_txt_shards
+from .txt import VOLUME_TYPES, TxtWriter
 
 typer_app = typer.Typer()
 
 
+@contextmanager
+def _replace_on_success(output_file: Path, mode: str) -> Iterator[IO]:
+    """
+    Open a temporary file next to `output_file`, moved over it only when
+    the block finishes, so a failed build keeps the previous book
+
+    :params output_file: file to write
+    :params mode: `w` or `wb`
+
+    :return: temporary file opened with `mode`
+    """
+    tmp_path = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open(mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 class BookType(str, Enum):
     json = "json"
     epub = "epub"
     txt = "txt"
+    cbor = "cbor"
 
 
 @typer_app.command()
@@ -28,23 +67,173 @@ def book(
     secondary_gamedata_path: Annotated[
         Path | None, typer.Option("--secondary-gamedata-path", "-s")
     ] = None,
+    jobs: Annotated[int, typer.Option("--jobs", "-j")] = 1,
+    cache_dir: Annotated[Path | None, typer.Option("--cache-dir")] = None,
+    no_cache: Annotated[bool, typer.Option("--no-cache")] = False,
+    table_cache_dir: Annotated[Path | None, typer.Option("--table-cache-dir")] = None,
+    rebuild_table_cache: Annotated[bool, typer.Option("--rebuild-table-cache")] = False,
+    build_dir: Annotated[Path | None, typer.Option("--build-dir")] = None,
+    revision: Annotated[str | None, typer.Option("--revision", "-r")] = None,
+    root: Annotated[str | None, typer.Option("--root")] = None,
+    secondary_revision: Annotated[
+        str | None, typer.Option("--secondary-revision")
+    ] = None,
+    secondary_root: Annotated[str | None, typer.Option("--secondary-root")] = None,
+    compact: Annotated[bool, typer.Option("--compact")] = False,
+    recover: Annotated[bool, typer.Option("--recover")] = False,
+    activity_ids: Annotated[list[str] | None, typer.Option("--activity")] = None,
+    entry_types: Annotated[list[EntryType] | None, typer.Option("--entry-type")] = None,
+    activity_types: Annotated[
+        list[ActivityType] | None, typer.Option("--activity-type")
+    ] = None,
+    operator_ids: Annotated[list[str] | None, typer.Option("--operator")] = None,
+    professions: Annotated[
+        list[Profession] | None, typer.Option("--profession")
+    ] = None,
+    powers: Annotated[list[str] | None, typer.Option("--power")] = None,
+    prefetch: Annotated[int, typer.Option("--prefetch")] = 0,
+    shard: Annotated[bool, typer.Option("--shard")] = False,
+    render_jobs: Annotated[int, typer.Option("--render-jobs")] = 1,
+    minify: Annotated[bool, typer.Option("--minify")] = False,
 ) -> None:
+    if shard and book_type in (BookType.epub, BookType.cbor):
+        raise typer.BadParameter("--shard only supports json and txt")
+    if minify and book_type != BookType.json:
+        raise typer.BadParameter("--minify only supports json")
+
+    story_cache: StoryCache | None = None
+    table_cache: TableCache | None = None
+    if not no_cache:
+        story_cache = StoryCache(cache_dir or StoryCache.default_path())
+        table_cache = TableCache(
+            table_cache_dir or TableCache.default_path(),
+            rebuild=rebuild_table_cache,
+        )
+
+    build_manifest: BuildManifest | None = None
+    if build_dir is not None:
+        build_manifest = BuildManifest(build_dir)
+
+    book_filter: BookFilter | None = None
+    if (
+        activity_ids
+        or entry_types
+        or activity_types
+        or operator_ids
+        or professions
+        or powers
+    ):
+        book_filter = BookFilter(
+            activity_ids=frozenset(activity_ids or ()),
+            entry_types=frozenset(entry_types or ()),
+            activity_types=frozenset(activity_types or ()),
+            operator_ids=frozenset(operator_ids or ()),
+            professions=frozenset(professions or ()),
+            powers=frozenset(powers or ()),
+        )
+
     print("Reading data...")
-    reader = Reader(main_gamedata_path, secondary_gamedata_path)
-    data = reader.read_data()
+    reader = Reader(
+        open_storage(main_gamedata_path, revision, root),
+        open_storage(secondary_gamedata_path, secondary_revision, secondary_root)
+        if secondary_gamedata_path is not None
+        else None,
+        workers=jobs,
+        cache=story_cache,
+        build=build_manifest,
+        compact=compact,
+        recover=recover,
+        table_cache=table_cache,
+        book_filter=book_filter,
+        prefetch=prefetch,
+    )
 
-    if book_type == BookType.json:
+    if shard:
+        print(f"Writing {book_type.value} shards...")
+        shard_writer = ShardWriter(output_file, book_type.value)
+        if book_type == BookType.json:
+            shards = iter_json_shards(
+                reader.read_metadata(),
+                reader.iter_activities(),
+                reader.iter_operators(),
+                JsonSerializer(minify),
+            )
+        else:
+            shards = iter_txt_shards(
+                reader.read_metadata(),
+                {
+                    volume_type: reader.iter_activities(volume_type)
+                    for volume_type in VOLUME_TYPES
+                },
+                reader.iter_operators(),
+            )
+        shard_writer.write(shards)
+        reader.finish()
+        print(
+            f"Shards: {shard_writer.written} written, "
+            f"{shard_writer.unchanged} unchanged, {shard_writer.removed} removed"
+        )
+    elif book_type == BookType.json:
         print("Writing json...")
-        with output_file.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, cls=ScriptJsonEncoder)
+        with _replace_on_success(output_file, "w") as f:
+            JsonSerializer(minify).dump_book(
+                f,
+                reader.read_metadata(),
+                reader.iter_activities(),
+                reader.iter_operators(),
+            )
+        reader.finish()
+    elif book_type == BookType.cbor:
+        print("Writing cbor...")
+        with _replace_on_success(output_file, "wb") as f:
+            CborSerializer().dump_book(
+                f,
+                reader.read_metadata(),
+                reader.iter_activities(),
+                reader.iter_operators(),
+            )
+        reader.finish()
     elif book_type == BookType.epub:
+        data = reader.read_data()
         print("Generating epub...")
         generator = EpubGenerator(data, output_file)
         generator.generate()
     elif book_type == BookType.txt:
         print("Generating txt...")
-        with output_file.open("w", encoding="utf-8") as f:
-            f.write(generate_txt(data))
+        with _replace_on_success(output_file, "w") as f:
+            TxtWriter(f, workers=render_jobs).write_book(
+                reader.read_metadata(),
+                {
+                    volume_type: reader.iter_activities(volume_type)
+                    for volume_type in VOLUME_TYPES
+                },
+                reader.iter_operators(),
+            )
+        reader.finish()
+
+    if story_cache is not None:
+        print(f"Story cache: {story_cache.hits} hits, {story_cache.misses} misses")
+    if table_cache is not None:
+        print(f"Table cache: {table_cache.hits} hits, {table_cache.misses} misses")
+    if build_manifest is not None:
+        print(
+            f"Incremental build: {build_manifest.reused} reused, "
+            f"{build_manifest.rebuilt} rebuilt"
+        )
+    print(f"Shared story files: {reader.deduplicated_reads} reads deduplicated")
+    reader.write_diagnostics(sys.stdout)
+
+
+@typer_app.command()
+def pack(
+    gamedata_path: Path,
+    output_file: Path,
+    revision: Annotated[str | None, typer.Option("--revision", "-r")] = None,
+    root: Annotated[str | None, typer.Option("--root")] = None,
+) -> None:
+    print("Packing gamedata...")
+    count = write_pack(open_storage(gamedata_path, revision, root), output_file)
+    print(f"Packed {count} files, {output_file.stat().st_size} bytes")
 
 
 class ComicAction(str, Enum):
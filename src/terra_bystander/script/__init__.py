@@ -1,21 +1,29 @@
+from .classifier import LineClassifier
 from .lexer import Tokenizer
 from .model import (
     ActionBase,
     Call,
+    Diagnostic,
     Property,
     ScriptLine,
     Token,
+    TokenStream,
     TokenType,
 )
 from .parser import Parser
+from .registry import CommandRegistry
 
 __all__ = [
     "ActionBase",
     "Call",
+    "CommandRegistry",
+    "Diagnostic",
+    "LineClassifier",
     "Parser",
     "Property",
     "ScriptLine",
     "Token",
+    "TokenStream",
     "Tokenizer",
     "TokenType",
 ]
@@ -0,0 +1,54 @@
+import re
+from collections.abc import Iterable
+
+# `[Command(` or `[Command]` at the start of a line, same separators as the lexer
+_LEADING_COMMAND = re.compile(
+    r"[ \t\r\n]*\[[ \t\r\n]*"
+    r"([^\[\]()'\",=: \t\r\n+\-][^\[\]()'\",=: \t\r\n]*)"
+    r"[ \t\r\n]*[(\]]"
+)
+
+
+class LineClassifier:
+    """
+    Classify code lines by their leading command without tokenizing them
+
+    A line starting with a command call parses to that single call, so if
+    the command is not interesting the line can be skipped. Every other
+    line is considered relevant and should be parsed in full.
+    """
+
+    DEFAULT_COMMANDS: frozenset[str] = frozenset({"background"})
+
+    def __init__(self, commands: Iterable[str] = DEFAULT_COMMANDS) -> None:
+        self.commands: frozenset[str] = frozenset(c.lower() for c in commands)
+
+    @staticmethod
+    def leading_command(code_line: str) -> str | None:
+        """
+        Get name of the command call starting the line
+
+        :params code_line: code line without line continuation
+
+        :return: command name, None if line does not start with a command call
+        """
+        match = _LEADING_COMMAND.match(code_line)
+        if match is None:
+            return None
+
+        name = match[1]
+        # tokenized as number or bool instead of identifier
+        if name[0].isdigit() or name in ["true", "false"]:
+            return None
+        return name
+
+    def is_relevant(self, code_line: str) -> bool:
+        """
+        Check whether the line needs full parsing
+
+        :params code_line: code line without line continuation
+
+        :return: False if line starts with a command not in `commands`
+        """
+        name = self.leading_command(code_line)
+        return name is None or name.lower() in self.commands
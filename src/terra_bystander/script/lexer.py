@@ -1,35 +1,322 @@
+import io
+import itertools
+import re
+from collections.abc import Callable, Iterator
+from functools import cache
+from typing import TextIO
+
 from .model import (
+    TOKEN_KINDS,
+    CodeLine,
+    Diagnostic,
     Token,
+    TokenStream,
     TokenType,
 )
 
+# characters `str.isdigit` accepts but `\d` does not, like superscripts and
+# circled numbers, as regex class ranges of Unicode 15.0 (Python 3.12)
+_NON_DECIMAL_DIGITS = (
+    "\u00b2\u00b3\u00b9\u1369-\u1371\u19da\u2070\u2074-\u2079\u2080-\u2089"
+    "\u2460-\u2468\u2474-\u247c\u2488-\u2490\u24ea\u24f5-\u24fd\u24ff"
+    "\u2776-\u277e\u2780-\u2788\u278a-\u2792\U00010a40-\U00010a43"
+    "\U00010e60-\U00010e68\U00011052-\U0001105a\U0001f100-\U0001f10a"
+)
+
+
+@cache
+def _scanner() -> re.Pattern[str]:
+    """
+    Compile the scanner regex, matching one token or separator of a line
+    like the state machine in `Tokenizer._tokenize`
+
+    :return: compiled regex
+    """
+    digit = rf"[\d{_NON_DECIMAL_DIGITS}]"
+    special = r"\[\]()'\",=: \t\r\n"
+    return re.compile(
+        rf"""
+        (?P<space>[ \t\r\n]+)
+        |(?P<punctuation>[\[\](),=:])
+        |'(?P<single_quote>[^']*)(?P<single_quote_end>'?)
+        |"(?P<double_quote>[^"]*)(?P<double_quote_end>"?)
+        |(?P<number>[+\-]{digit}*(?:\.{digit}*)?|{digit}+(?:\.{digit}*)?)
+        |(?P<identifier>[^{special}+\-\d{_NON_DECIMAL_DIGITS}][^{special}]*)
+        """,
+        re.VERBOSE,
+    )
+
+
+_PUNCTUATIONS: dict[str, int] = {
+    t.value: TOKEN_KINDS[t]
+    for t in (
+        TokenType.LEFT_BRACKET,
+        TokenType.RIGHT_BRACKET,
+        TokenType.LEFT_PARENTHESIS,
+        TokenType.RIGHT_PARENTHESIS,
+        TokenType.COMMA,
+        TokenType.EQUAL,
+        TokenType.COLON,
+    )
+}
+_LEFT_BRACKET = TOKEN_KINDS[TokenType.LEFT_BRACKET]
+_RIGHT_BRACKET = TOKEN_KINDS[TokenType.RIGHT_BRACKET]
+_BOOL = TOKEN_KINDS[TokenType.BOOL]
+_IDENTIFIER = TOKEN_KINDS[TokenType.IDENTIFIER]
+_STRING = TOKEN_KINDS[TokenType.STRING]
+_NUMBER = TOKEN_KINDS[TokenType.NUMBER]
+_ACTOR_TEXT = TOKEN_KINDS[TokenType.ACTOR_TEXT]
+
+
+def _syntax_error(message: str, column: int) -> SyntaxError:
+    """
+    Create error of a code line, `offset` is the 1-based column so callers
+    can locate it in the source, the message stays as is
+
+    :params message: error message
+    :params column: 0-based position in code line
+
+    :return: `SyntaxError`
+    """
+    error = SyntaxError(message)
+    error.offset = column + 1
+    return error
+
 
 class Tokenizer:
     @staticmethod
     def split_code_lines(code: str) -> list[str]:
-        lines: list[str] = []
+        return [line.text for line in Tokenizer.iter_code_lines(code)]
 
-        tmp: str = ""
-        for line in code.split("\n"):
-            line = line.strip("\r")
-            if line.endswith("\\"):
-                tmp += line[:-1]
+    @staticmethod
+    def iter_code_lines(source: str | bytes | TextIO) -> Iterator[CodeLine]:
+        """
+        Iterate non-empty code lines of a source, lines ending with `\\`
+        are joined with the next line
+
+        :params source: text, utf-8 bytes or text stream,
+            bytes are read with universal newlines
+
+        :return: `Iterator[CodeLine]`
+        """
+        stream: TextIO
+        if isinstance(source, str):
+            # split at `\n` only, like `str.split`
+            stream = io.StringIO(source, newline="\n")
+        elif isinstance(source, bytes):
+            stream = io.TextIOWrapper(io.BytesIO(source), encoding="utf-8")
+        else:
+            stream = source
+
+        number = 0
+        line_number = 0
+        offset = 0
+        pending = ""
+        pieces: list[str] = []
+        parts: list[tuple[int, int, int, int]] = []
+        column = 0
+        # None marks the end, text after the last `\n` is a line too
+        for chunk in itertools.chain(stream, (None,)):
+            if chunk is None:
+                line = pending
+            elif chunk.endswith("\n"):
+                line = pending + chunk[:-1] if pending else chunk[:-1]
             else:
-                combined_line = tmp + line
-                if combined_line:
-                    lines.append(tmp + line)
-                tmp = ""
+                # stream split at other newlines
+                pending += chunk
+                continue
+            pending = ""
+            line_number += 1
+            line_offset = offset
+            offset += len(line) + 1
+
+            line_column = 0
+            if "\r" in line:
+                stripped = line.lstrip("\r")
+                line_column = len(line) - len(stripped)
+                line = stripped.rstrip("\r")
+
+            if line.endswith("\\"):
+                pieces.append(line[:-1])
+                parts.append(
+                    (column, line_number, line_column, line_offset + line_column)
+                )
+                column += len(line) - 1
+                continue
+
+            if pieces:
+                pieces.append(line)
+                parts.append(
+                    (column, line_number, line_column, line_offset + line_column)
+                )
+                text = "".join(pieces)
+                if text:
+                    number += 1
+                    yield CodeLine(text, number, parts[0][1], parts[0][3], parts)
+                pieces = []
+                parts = []
+                column = 0
+            elif line:
+                number += 1
+                if line_column:
+                    part = (0, line_number, line_column, line_offset + line_column)
+                    yield CodeLine(line, number, line_number, part[3], [part])
+                else:
+                    yield CodeLine(line, number, line_number, line_offset)
+
+    @staticmethod
+    def iter_tokens(
+        source: str | bytes | TextIO,
+        path: str | None = None,
+        is_relevant: Callable[[str], bool] | None = None,
+        diagnostics: list[Diagnostic] | None = None,
+    ) -> Iterator[tuple[CodeLine, TokenStream]]:
+        """
+        Tokenize a whole source line by line, errors are raised as
+        `SyntaxError` located at `path`, physical line and column
+
+        :params source: text, utf-8 bytes or text stream
+        :params path: file name in error messages
+        :params is_relevant: filter of code lines to tokenize, all if None
+        :params diagnostics: if not None, record errors here and skip their lines
+            instead of raising
+
+        :return: code lines with their tokens, the stream is reused for every line
+        """
+        stream = TokenStream()
+        for line in Tokenizer.iter_code_lines(source):
+            if is_relevant is not None and not is_relevant(line.text):
+                continue
+            stream.clear()
+            try:
+                Tokenizer._tokenize_regex(line.text, stream)
+            except SyntaxError as e:
+                column = e.offset - 1 if e.offset is not None else None
+                error = Tokenizer.located_error(e, line, path, column)
+                if diagnostics is None:
+                    raise error from e
+                diagnostics.append(Diagnostic.from_error(error))
+                continue
+            yield line, stream
+
+    @staticmethod
+    def located_error(
+        error: Exception,
+        line: CodeLine,
+        path: str | None,
+        column: int | None = None,
+    ) -> SyntaxError:
+        """
+        Create error pointing at source position of a code line
 
-        return lines
+        :params error: error without position
+        :params line: code line of the error
+        :params path: file name
+        :params column: 0-based position in code line, None if unknown
+
+        :return: `SyntaxError` with file name, line and offset
+        """
+        line_number, column_number = line.line, None
+        if column is not None:
+            line_number, line_column, _ = line.position(column)
+            column_number = line_column + 1
+        message = error.msg if isinstance(error, SyntaxError) else str(error)
+        return SyntaxError(
+            message, (path or "<unknown>", line_number, column_number, line.text)
+        )
 
     @staticmethod
-    def tokenize(code_line: str) -> list[Token]:
+    def tokenize(code_line: str, reference: bool = False) -> list[Token]:
+        """
+        Tokenize a code line
+
+        :params code_line: code line without line continuation
+        :params reference: use the character state machine instead of the regex scanner
+
+        :return: `list[Token]`
+        """
+        try:
+            if reference:
+                return Tokenizer._tokenize(code_line)
+            return list(Tokenizer._tokenize_regex(code_line, TokenStream()))
+        except:
+            print(f"Error at: {code_line}")
+            raise
+
+    @staticmethod
+    def tokenize_into(code_line: str, stream: TokenStream) -> TokenStream:
+        """
+        Tokenize a code line into a reused token stream
+
+        :params code_line: code line without line continuation
+        :params stream: stream to clear and fill
+
+        :return: `stream`
+        """
+        stream.clear()
         try:
-            return Tokenizer._tokenize(code_line)
+            return Tokenizer._tokenize_regex(code_line, stream)
         except:
             print(f"Error at: {code_line}")
             raise
 
+    @staticmethod
+    def _tokenize_regex(code_line: str, stream: TokenStream) -> TokenStream:
+        push = stream.append
+        remain_bracket_count = 0
+        line_length = len(code_line)
+
+        for match in _scanner().finditer(code_line):
+            kind = match.lastgroup
+            value = match.group(kind) if kind is not None else ""
+
+            if kind == "space":
+                continue
+
+            if kind == "punctuation":
+                token_kind = _PUNCTUATIONS[value]
+                push(token_kind, value, match.start())
+                if token_kind == _LEFT_BRACKET:
+                    remain_bracket_count += 1
+                elif token_kind == _RIGHT_BRACKET:
+                    remain_bracket_count -= 1
+                    if remain_bracket_count == 0:
+                        # the rest of line is actor text
+                        actor_text = code_line[match.end() :]
+                        if actor_text != "":
+                            push(_ACTOR_TEXT, actor_text.strip(), match.end())
+                        break
+                continue
+
+            if kind == "single_quote_end" or kind == "double_quote_end":
+                if value == "":
+                    # string is never closed, the rest of line is actor text
+                    actor_text = match.group(kind.removesuffix("_end"))
+                    if actor_text != "":
+                        push(_ACTOR_TEXT, actor_text.strip(), match.start())
+                    break
+                push(_STRING, match.group(kind.removesuffix("_end")), match.start())
+                continue
+
+            if match.end() == line_length:
+                # unfinished token at the end of line is actor text
+                push(_ACTOR_TEXT, value.strip(), match.start())
+                break
+
+            if kind == "number":
+                if code_line[match.end()] == TokenType.POINT.value:
+                    raise _syntax_error(
+                        f"Error when parsing number at position {match.end()}:  .",
+                        match.end(),
+                    )
+                push(_NUMBER, value, match.start())
+            elif value in ["true", "false"]:
+                push(_BOOL, value, match.start())
+            else:
+                push(_IDENTIFIER, value, match.start())
+
+        return stream
+
     @staticmethod
     def _tokenize(code_line: str) -> list[Token]:
         tokens: list[Token] = []
@@ -59,8 +346,8 @@ class Tokenizer:
                         tmp += char
                         continue
                     else:
-                        raise SyntaxError(
-                            f"Error when parsing number at position {i}:  {char}"
+                        raise _syntax_error(
+                            f"Error when parsing number at position {i}:  {char}", i
                         )
                 elif char.isdigit():
                     tmp += char
@@ -135,16 +422,16 @@ class Tokenizer:
                 if status is None:
                     status = TokenType.SINGLE_QUOTE
                 else:
-                    raise SyntaxError(
-                        f"Invalid syntax for string at position {i}:{char}"
+                    raise _syntax_error(
+                        f"Invalid syntax for string at position {i}:{char}", i
                     )
             elif char == TokenType.DOUBLE_QUOTE.value:
                 push_identifier()
                 if status is None:
                     status = TokenType.DOUBLE_QUOTE
                 else:
-                    raise SyntaxError(
-                        f"Invalid syntax for string at position {i}:{char}"
+                    raise _syntax_error(
+                        f"Invalid syntax for string at position {i}:{char}", i
                     )
 
             elif status is None and (char.isdigit() or char in ["+", "-"]):
@@ -1,3 +1,6 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any
@@ -35,6 +38,133 @@ class Token:
     value: str = ""
 
 
+# small-int kind of each token type in `TokenStream`
+TOKEN_TYPES: tuple[TokenType, ...] = tuple(TokenType)
+TOKEN_KINDS: dict[TokenType, int] = {t: i for i, t in enumerate(TOKEN_TYPES)}
+
+
+class TokenStream:
+    """
+    Tokens of a line as parallel arrays of kinds and values,
+    cleared and refilled for each line without shrinking
+    """
+
+    __slots__ = ("kinds", "values", "columns", "length")
+
+    def __init__(self, tokens: Iterable[Token] = ()) -> None:
+        self.kinds: array[int] = array("B")
+        self.values: list[str] = []
+        self.columns: array[int] = array("I")
+        self.length: int = 0
+        for token in tokens:
+            self.append(TOKEN_KINDS[token.type], token.value)
+
+    def append(self, kind: int, value: str = "", column: int = 0) -> None:
+        """
+        Append a token
+
+        :params kind: kind in `TOKEN_KINDS`
+        :params value: token value
+        :params column: 0-based position of token in code line
+        """
+        n = self.length
+        if n < len(self.kinds):
+            self.kinds[n] = kind
+            self.values[n] = value
+            self.columns[n] = column
+        else:
+            self.kinds.append(kind)
+            self.values.append(value)
+            self.columns.append(column)
+        self.length = n + 1
+
+    def clear(self) -> None:
+        """
+        Remove all tokens, keeping allocated space
+        """
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("token index out of range")
+        return Token(TOKEN_TYPES[self.kinds[index]], self.values[index])
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(self.length):
+            yield Token(TOKEN_TYPES[self.kinds[i]], self.values[i])
+
+
+@dataclass(slots=True)
+class CodeLine:
+    """
+    Logical code line of a source, physical lines joined by line continuations
+    """
+
+    text: str
+    # 1-based number among logical lines of the source
+    number: int
+    # 1-based physical line where the code line starts
+    line: int
+    # offset in source where the code line starts
+    offset: int
+    # (column in `text`, 1-based physical line, column in that line,
+    # offset in source) where each joined physical line starts,
+    # None if the code line is one physical line from its start
+    parts: list[tuple[int, int, int, int]] | None = None
+
+    def position(self, column: int) -> tuple[int, int, int]:
+        """
+        Get source position of a column
+
+        :params column: 0-based position in `text`
+
+        :return: 1-based physical line, 0-based column in that line and offset in source
+        """
+        if self.parts is None:
+            return self.line, column, self.offset + column
+
+        i = bisect_right(self.parts, column, key=lambda part: part[0]) - 1
+        start, line, line_column, offset = self.parts[max(i, 0)]
+        return line, line_column + column - start, offset + column - start
+
+
+@dataclass(slots=True)
+class Diagnostic:
+    """
+    Syntax error of a code line skipped while recovering
+    """
+
+    path: str
+    # 1-based physical line
+    line: int
+    # 1-based column, None if unknown
+    column: int | None
+    message: str
+
+    @staticmethod
+    def from_error(error: SyntaxError) -> "Diagnostic":
+        """
+        Create diagnostic from a located error
+
+        :params error: error raised by `Tokenizer.iter_tokens` or `Parser.parse_source`
+
+        :return: `Diagnostic`
+        """
+        return Diagnostic(
+            error.filename or "<unknown>", error.lineno or 0, error.offset, error.msg
+        )
+
+    def __str__(self) -> str:
+        if self.column is None:
+            return f"{self.path}:{self.line}: {self.message}"
+        return f"{self.path}:{self.line}:{self.column}: {self.message}"
+
+
 # Parser
 @dataclass
 class ActionBase:
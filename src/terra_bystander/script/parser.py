@@ -1,21 +1,102 @@
+from array import array
+from collections.abc import Callable, Iterator
+from typing import TextIO
+
+from .lexer import Tokenizer
 from .model import (
+    TOKEN_KINDS,
+    TOKEN_TYPES,
     ActionBase,
     Call,
+    CodeLine,
+    Diagnostic,
     Property,
     ScriptLine,
     Token,
+    TokenStream,
     TokenType,
 )
 
+_LEFT_BRACKET = TOKEN_KINDS[TokenType.LEFT_BRACKET]
+_RIGHT_BRACKET = TOKEN_KINDS[TokenType.RIGHT_BRACKET]
+_LEFT_PARENTHESIS = TOKEN_KINDS[TokenType.LEFT_PARENTHESIS]
+_RIGHT_PARENTHESIS = TOKEN_KINDS[TokenType.RIGHT_PARENTHESIS]
+_EQUAL = TOKEN_KINDS[TokenType.EQUAL]
+_COLON = TOKEN_KINDS[TokenType.COLON]
+_COMMA = TOKEN_KINDS[TokenType.COMMA]
+_BOOL = TOKEN_KINDS[TokenType.BOOL]
+_IDENTIFIER = TOKEN_KINDS[TokenType.IDENTIFIER]
+_STRING = TOKEN_KINDS[TokenType.STRING]
+_NUMBER = TOKEN_KINDS[TokenType.NUMBER]
+_ACTOR_TEXT = TOKEN_KINDS[TokenType.ACTOR_TEXT]
+# kind past the last token
+_END = -1
+
 
 class Parser:
-    def __init__(self, tokens: list[Token]) -> None:
-        self.tokens: list[Token] = tokens
+    def __init__(self, tokens: list[Token] | TokenStream) -> None:
+        self.reset(tokens)
+
+    def reset(self, tokens: list[Token] | TokenStream) -> "Parser":
+        """
+        Parse another line with this parser
+
+        :params tokens: tokens of the line, a `TokenStream` is used without copying
+
+        :return: self
+        """
+        self.tokens: list[Token] | TokenStream = tokens
+        stream = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
+        self._kinds: array[int] = stream.kinds
+        self._values: list[str] = stream.values
+        self._length: int = stream.length
         self._index: int = 0
+        return self
+
+    @staticmethod
+    def parse_source(
+        source: str | bytes | TextIO,
+        path: str | None = None,
+        is_relevant: Callable[[str], bool] | None = None,
+        diagnostics: list[Diagnostic] | None = None,
+    ) -> Iterator[tuple[CodeLine, ScriptLine]]:
+        """
+        Parse a whole source line by line, errors are raised as
+        `SyntaxError` located at `path`, line and column
+
+        :params source: text, utf-8 bytes or text stream
+        :params path: file name in error messages
+        :params is_relevant: filter of code lines to parse, all if None
+        :params diagnostics: if not None, record errors here and skip their lines
+            instead of raising
+
+        :return: code lines with their syntax trees
+        """
+        parser: Parser | None = None
+        for line, stream in Tokenizer.iter_tokens(
+            source, path, is_relevant, diagnostics
+        ):
+            if parser is None:
+                parser = Parser(stream)
+            else:
+                parser.reset(stream)
+            try:
+                script_line = parser._parse()
+            except (SyntaxError, ValueError) as e:
+                # values like `+` fail number conversion
+                column = len(line.text)
+                if parser._index < parser._length:
+                    column = stream.columns[parser._index]
+                error = Tokenizer.located_error(e, line, path, column)
+                if diagnostics is None:
+                    raise error from e
+                diagnostics.append(Diagnostic.from_error(error))
+                continue
+            yield line, script_line
 
     def parse(self) -> ScriptLine:
         try:
-            return ScriptLine(self._expression(), self._actor_text())
+            return self._parse()
         except:
             print(f"Token index: {self._index}")
             print(f"Current token: {self._current_token}")
@@ -24,113 +105,60 @@ class Parser:
                 print(f"{t.type} {t.value}")
             raise
 
-    @property
-    def _current_token(self) -> Token | None:
-        if self._index >= len(self.tokens):
-            return None
-        return self.tokens[self._index]
+    def _parse(self) -> ScriptLine:
+        return ScriptLine(self._expression(), self._actor_text())
 
     @property
-    def _next_token(self) -> Token | None:
-        if self._index + 1 >= len(self.tokens):
+    def _current_token(self) -> Token | None:
+        if self._index >= self._length:
             return None
-        return self.tokens[self._index + 1]
+        return Token(TOKEN_TYPES[self._kinds[self._index]], self._values[self._index])
 
-    @property
-    def _next2_token(self) -> Token | None:
-        if self._index + 2 >= len(self.tokens):
-            return None
-        return self.tokens[self._index + 2]
+    def _current_kind(self) -> int:
+        if self._index >= self._length:
+            return _END
+        return self._kinds[self._index]
 
-    def _left_bracket(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.LEFT_BRACKET
-        ):
+    def _accept(self, kind: int) -> bool:
+        if self._index < self._length and self._kinds[self._index] == kind:
             self._index += 1
             return True
         return False
 
+    def _left_bracket(self) -> bool:
+        return self._accept(_LEFT_BRACKET)
+
     def _right_bracket(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.RIGHT_BRACKET
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_RIGHT_BRACKET)
 
     def _left_parenthesis(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.LEFT_PARENTHESIS
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_LEFT_PARENTHESIS)
 
     def _right_parenthesis(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.RIGHT_PARENTHESIS
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_RIGHT_PARENTHESIS)
 
     def _equal(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.EQUAL
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_EQUAL)
 
     def _colon(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.COLON
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_COLON)
 
     def _assign(self) -> bool:
-        if self._current_token is None:
-            return False
-
-        if self._equal():
-            return True
-        if self._colon():
-            return True
-        return False
+        return self._equal() or self._colon()
 
     def _comma(self) -> bool:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.COMMA
-        ):
-            self._index += 1
-            return True
-        return False
+        return self._accept(_COMMA)
 
     def _identifier(self) -> str | None:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.IDENTIFIER
-        ):
-            ret = self._current_token.value
+        if self._current_kind() == _IDENTIFIER:
+            ret = self._values[self._index]
             self._index += 1
             return ret
         return None
 
     def _actor_text(self) -> str | None:
-        if (
-            self._current_token is not None
-            and self._current_token.type == TokenType.ACTOR_TEXT
-        ):
-            ret = self._current_token.value
+        if self._current_kind() == _ACTOR_TEXT:
+            ret = self._values[self._index]
             self._index += 1
             return ret
         return None
@@ -149,20 +177,23 @@ class Parser:
             self._index -= 1  # reverse index changed by identifier
             return None
 
-        if self._current_token is None:
+        kind = self._current_kind()
+        if kind == _END:
             raise SyntaxError("Cannot find value for property")
 
-        if self._current_token.type == TokenType.STRING:
-            value = self._current_token.value
+        value: str | bool | int | float | None
+        if kind == _STRING:
+            value = self._values[self._index]
             self._index += 1
-        elif self._current_token.type == TokenType.BOOL:
-            value = bool(self._current_token.value)
+        elif kind == _BOOL:
+            value = bool(self._values[self._index])
             self._index += 1
-        elif self._current_token.type == TokenType.NUMBER:
-            if "." in self._current_token.value:
-                value = float(self._current_token.value)
+        elif kind == _NUMBER:
+            raw_value = self._values[self._index]
+            if "." in raw_value:
+                value = float(raw_value)
             else:
-                value = int(self._current_token.value)
+                value = int(raw_value)
             self._index += 1
 
         elif self._boundary():
@@ -0,0 +1,120 @@
+from collections.abc import Callable
+
+from .classifier import LineClassifier
+from .model import Call, Property, ScriptLine
+
+type CallHandler[T] = Callable[[Call, ScriptLine, T], bool]
+type PropertyHandler[T] = Callable[[Property, ScriptLine, T], bool]
+type TextHandler[T] = Callable[[ScriptLine, T], None]
+
+
+class CommandRegistry[T]:
+    """
+    Handlers of script commands, all run in one walk of each line
+
+    Call handlers are keyed by case-insensitive command name, property
+    handlers by exact key. A handler returns True to stop handling the
+    rest of the line. `T` is the state handlers write extracted data to.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, CallHandler[T]] = {}
+        self._properties: dict[str, PropertyHandler[T]] = {}
+        self._text: TextHandler[T] | None = None
+        # command names as written in scripts, to skip normalizing them again
+        self._call_cache: dict[str, CallHandler[T] | None] = {}
+        self._classifier: LineClassifier | None = None
+
+    def on_call(self, name: str) -> Callable[[CallHandler[T]], CallHandler[T]]:
+        """
+        Register handler of a command call, as decorator
+
+        :params name: command name, case-insensitive
+
+        :return: decorator
+        """
+
+        def register(handler: CallHandler[T]) -> CallHandler[T]:
+            self._calls[name.lower()] = handler
+            self._call_cache.clear()
+            self._classifier = None
+            return handler
+
+        return register
+
+    def on_property(
+        self, key: str
+    ) -> Callable[[PropertyHandler[T]], PropertyHandler[T]]:
+        """
+        Register handler of a property, as decorator
+
+        :params key: property key, case-sensitive
+
+        :return: decorator
+        """
+
+        def register(handler: PropertyHandler[T]) -> PropertyHandler[T]:
+            self._properties[key] = handler
+            return handler
+
+        return register
+
+    def on_text(self, handler: TextHandler[T]) -> TextHandler[T]:
+        """
+        Register handler of lines without command, as decorator
+
+        :params handler: handler
+
+        :return: handler
+        """
+        self._text = handler
+        return handler
+
+    @property
+    def commands(self) -> frozenset[str]:
+        """
+        Normalized names of commands with call handler
+        """
+        return frozenset(self._calls)
+
+    def classifier(self) -> LineClassifier:
+        """
+        Get classifier skipping lines whose leading command has no handler
+
+        :return: `LineClassifier`
+        """
+        if self._classifier is None:
+            self._classifier = LineClassifier(self._calls)
+        return self._classifier
+
+    def _call_handler(self, name: str) -> CallHandler[T] | None:
+        try:
+            return self._call_cache[name]
+        except KeyError:
+            handler = self._calls.get(name.lower())
+            self._call_cache[name] = handler
+            return handler
+
+    def dispatch(self, line: ScriptLine, state: T) -> None:
+        """
+        Run handlers of a line
+
+        :params line: parsed line
+        :params state: state passed to handlers
+        """
+        if line.actions is None:
+            if self._text is not None:
+                self._text(line, state)
+            return
+
+        for action in line.actions:
+            if isinstance(action, Property):
+                property_handler = self._properties.get(action.key)
+                if property_handler is not None and property_handler(
+                    action, line, state
+                ):
+                    break
+            elif isinstance(action, Call):
+                call_handler = self._call_handler(action.name)
+                if call_handler is not None and call_handler(action, line, state):
+                    break
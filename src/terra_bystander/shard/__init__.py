@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from ..gamedata import (
+    Activity,
+    ActivityType,
+    GameDataMetadata,
+    JsonSerializer,
+    Operator,
+)
+from ..txt import VOLUME_TYPES, render_activity, render_metadata, render_operator
+
+# bump when layout of shard directory or manifest changes
+SHARD_MANIFEST_VERSION = "2"
+
+# directory of shards of each kind, like keys of the single json book
+SHARD_DIRECTORIES: dict[str, str] = {
+    "activity": "activities",
+    "operator": "operators",
+}
+
+
+@dataclass(slots=True)
+class Shard:
+    """
+    Rendered content of one shard file
+
+    `kind` is `metadata`, `activity` or `operator`. `stable` is the content
+    without parts that change on every run, like the generation date,
+    compared to tell whether the shard changed. None if `content` is stable.
+    """
+
+    kind: str
+    id: str
+    title: str
+    content: str
+    stable: str | None = None
+
+
+@dataclass(slots=True)
+class ShardEntry:
+    """
+    Shard file listed in the manifest, `path` relative to shard directory
+
+    `sha256` and `size` are of the file, `stable_sha256` of the content
+    compared between runs.
+    """
+
+    kind: str
+    id: str
+    title: str
+    path: str
+    sha256: str
+    size: int
+    stable_sha256: str
+
+
+def iter_json_shards(
+    metadata: GameDataMetadata,
+    activities: Iterable[Activity],
+    operators: Iterable[Operator],
+    serializer: JsonSerializer | None = None,
+) -> Iterator[Shard]:
+    """
+    Render json shards, each the same as its entity in the single json book
+
+    :params metadata: game data metadata
+    :params activities: activities
+    :params operators: operators
+    :params serializer: json serializer, default not minified
+
+    :return: shards in book order
+    """
+    if serializer is None:
+        serializer = JsonSerializer()
+    yield Shard("metadata", "metadata", "", serializer.dumps(metadata))
+    for activity in activities:
+        yield Shard("activity", activity.id, activity.name, serializer.dumps(activity))
+    for operator in operators:
+        yield Shard("operator", operator.id, operator.name, serializer.dumps(operator))
+
+
+def iter_txt_shards(
+    metadata: GameDataMetadata,
+    volumes: Mapping[ActivityType, Iterable[Activity]],
+    operators: Iterable[Operator],
+) -> Iterator[Shard]:
+    """
+    Render txt shards, concatenated in order they are the single txt book
+
+    :params metadata: game data metadata
+    :params volumes: activities of each type in `VOLUME_TYPES`, consumed in order
+    :params operators: operators
+
+    :return: shards in book order
+    """
+    # the generation date alone does not make the header changed
+    yield Shard(
+        "metadata",
+        "metadata",
+        "",
+        render_metadata(metadata),
+        stable=render_metadata(metadata, generated_date=""),
+    )
+    for volume_type in VOLUME_TYPES:
+        for activity in volumes[volume_type]:
+            yield Shard(
+                "activity",
+                activity.id,
+                activity.name,
+                render_activity(activity, volume_type),
+            )
+    for operator in operators:
+        yield Shard("operator", operator.id, operator.name, render_operator(operator))
+
+
+def _write_file(file_path: Path, data: bytes) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class ShardWriter:
+    """
+    Write a book as one file per activity and operator into a directory,
+    with `manifest.json` listing the files in book order with content hashes
+
+    Shards are encoded, hashed and written on a thread pool, at most
+    `window` shards are held at a time. A shard whose hash matches the
+    previous manifest is not rewritten, and files of the previous manifest
+    no longer in the book are removed, so a sync of the directory only
+    copies what changed.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(
+        self,
+        path: str | Path,
+        suffix: str,
+        workers: int = 4,
+        window: int | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.suffix = suffix
+        self.workers = workers
+        self.window = window if window is not None else workers * 4
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+        self._previous: dict[str, ShardEntry] = self._load()
+
+    def _load(self) -> dict[str, ShardEntry]:
+        """
+        Load entries of previous manifest, ignore it if missing or outdated
+
+        :return: entries keyed by path
+        """
+        try:
+            with (self.path / self.MANIFEST_NAME).open(encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["version"] != SHARD_MANIFEST_VERSION:
+                return {}
+            entries = [ShardEntry(**entry) for entry in manifest["shards"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+        # only files inside the directory are rewritten or removed
+        return {
+            entry.path: entry
+            for entry in entries
+            if not Path(entry.path).is_absolute() and ".." not in Path(entry.path).parts
+        }
+
+    def _shard_path(self, shard: Shard) -> str:
+        # ids are file names, keep them portable
+        name = re.sub(r"[^\w.-]", "_", shard.id)
+        if shard.kind not in SHARD_DIRECTORIES:
+            return f"{name}.{self.suffix}"
+        return f"{SHARD_DIRECTORIES[shard.kind]}/{name}.{self.suffix}"
+
+    def _write_shard(self, shard: Shard) -> tuple[ShardEntry, bool]:
+        """
+        Encode, hash and write a shard if changed, run on the thread pool
+
+        An unchanged shard keeps its file, and hash and size of the file
+        in the previous manifest.
+
+        :params shard: shard
+
+        :return: manifest entry and whether the file is written
+        """
+        path = self._shard_path(shard)
+        data = shard.content.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        stable_sha256 = sha256
+        if shard.stable is not None:
+            stable_sha256 = hashlib.sha256(shard.stable.encode("utf-8")).hexdigest()
+
+        previous = self._previous.get(path)
+        file_path = self.path / path
+        if (
+            previous is not None
+            and previous.stable_sha256 == stable_sha256
+            and file_path.is_file()
+            and file_path.stat().st_size == previous.size
+        ):
+            return replace(
+                previous, kind=shard.kind, id=shard.id, title=shard.title
+            ), False
+
+        _write_file(file_path, data)
+        entry = ShardEntry(
+            kind=shard.kind,
+            id=shard.id,
+            title=shard.title,
+            path=path,
+            sha256=sha256,
+            size=len(data),
+            stable_sha256=stable_sha256,
+        )
+        return entry, True
+
+    def write(self, shards: Iterable[Shard]) -> None:
+        """
+        Write shards and manifest, remove shards of previous manifest not
+        in `shards`
+
+        :params shards: shards in book order, consumed as the window frees
+        """
+        entries: list[ShardEntry] = []
+
+        def collect(future: Future[tuple[ShardEntry, bool]]) -> None:
+            entry, written = future.result()
+            entries.append(entry)
+            if written:
+                self.written += 1
+            else:
+                self.unchanged += 1
+
+        pending: deque[Future[tuple[ShardEntry, bool]]] = deque()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="shard") as executor:
+            for shard in shards:
+                pending.append(executor.submit(self._write_shard, shard))
+                if len(pending) >= self.window:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+
+        paths = {entry.path for entry in entries}
+        for path in self._previous:
+            if path not in paths:
+                (self.path / path).unlink(missing_ok=True)
+                self.removed += 1
+
+        manifest = {
+            "version": SHARD_MANIFEST_VERSION,
+            "suffix": self.suffix,
+            "shards": [asdict(entry) for entry in entries],
+        }
+        _write_file(
+            self.path / self.MANIFEST_NAME,
+            json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
+        self._previous = {entry.path: entry for entry in entries}
+
+
+__all__ = [
+    "Shard",
+    "ShardEntry",
+    "ShardWriter",
+    "iter_json_shards",
+    "iter_txt_shards",
+]
@@ -1,9 +1,15 @@
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
+from typing import TextIO
 
 from ..gamedata import (
     Activity,
     ActivityType,
     GameDataForBook,
+    GameDataMetadata,
+    Operator,
 )
 
 ACTIVITY_TYPE_LABEL: dict[str, str] = {
@@ -14,89 +20,353 @@ ACTIVITY_TYPE_LABEL: dict[str, str] = {
 }
 
 
-def generate_txt(data: GameDataForBook) -> str:
+VOLUME_TYPES: list[ActivityType] = [
+    ActivityType.MAIN_STORY,
+    ActivityType.ACTIVITY_STORY,
+    ActivityType.MINI_STORY,
+]
+
+
+def _metadata_fragments(
+    metadata: GameDataMetadata, generated_date: str | None = None
+) -> Iterator[str]:
+    if generated_date is None:
+        generated_date = datetime.now().strftime("%Y-%m-%d")
+    yield "【游戏数据版本】" + metadata.version + "\n"
+    yield "【游戏数据日期】" + metadata.date + "\n"
+    yield "【文件生成日期】" + generated_date + "\n"
+    yield "\n"
+
+
+def _activities_fragments(
+    activities: Iterable[Activity], volume_title: str
+) -> Iterator[str]:
+    for activity in activities:
+        yield f"『{volume_title}』{activity.name}\n"
+        for story in activity.stories:
+            yield f"「{story.name}」{story.avg_tag}\n"
+            yield story.description
+            for line in story.texts:
+                if line.name != "":
+                    yield f"【{line.name}】{line.text}\n"
+                else:
+                    yield f"{line.text}\n"
+        yield "\n"
+
+
+def _operator_fragments(operator: Operator) -> Iterator[str]:
+    yield f"『干员』{operator.name}\n"
+    yield f"{operator.profession.name} {operator.sub_profession}\n"
+    yield operator.usage + "\n"
+    yield operator.description + "\n"
+
+    if len(operator.operator_stories) > 0:
+        yield "「干员档案」\n"
+        for line in operator.operator_stories:
+            yield line.title + "\n"
+            yield line.text + "\n"
+
+    if operator.uniequips is not None and len(operator.uniequips) > 0:
+        yield "「模组」\n"
+        for uniequip in operator.uniequips:
+            yield (
+                "【"
+                + uniequip.name
+                + "（"
+                + uniequip.type_name_1
+                + (
+                    ("-" + uniequip.type_name_2)
+                    if uniequip.type_name_2 is not None
+                    else ""
+                )
+                + "）】\n"
+            )
+            yield uniequip.description + "\n"
+
+    if len(operator.voices) > 0:
+        yield "语音记录\n"
+        for voice in operator.voices:
+            yield "【" + voice.title + "】" + voice.text + "\n"
+
+    if len(operator.avgs) > 0:
+        yield "「干员密录」\n"
+        yield from _activities_fragments(operator.avgs, "干员密录")
+
+
+def _activities_content(activities: Iterable[Activity], volume_title: str) -> str:
+    return "".join(_activities_fragments(activities, volume_title))
+
+
+def _operator_content(operator: Operator) -> str:
+    return "".join(_operator_fragments(operator))
+
+
+# activity with its volume title, or operator
+type _Section = tuple[Activity, str] | tuple[Operator, None]
+
+
+def _render_section(section: _Section) -> str:
     """
-    Generate txt content from game data
+    Render a section without `\\r\\n` normalization, run in worker processes
 
-    :params data: game data
+    :params section: activity with volume title, or operator
 
-    :return: txt content
+    :return: section text
+    """
+    entity, volume_title = section
+    if isinstance(entity, Operator):
+        return _operator_content(entity)
+    assert volume_title is not None
+    return _activities_content([entity], volume_title)
+
+
+class TxtWriter:
     """
+    Write txt book to a text file section by section, without building
+    the whole book in memory
+
+    Fragments are buffered up to `buffer_size` characters. `\\r\\n` is
+    normalized to `\\n` per fragment, a trailing `\\r` is held back until
+    the next fragment, so output is the same as normalizing whole sections.
+
+    With `workers` > 1, `write_book` renders sections on a process pool and
+    writes them in order, at most `window` sections are rendered ahead.
+    """
+
+    def __init__(
+        self,
+        f: TextIO,
+        buffer_size: int = 64 * 1024,
+        workers: int = 1,
+        window: int | None = None,
+    ) -> None:
+        self.f = f
+        self.buffer_size = buffer_size
+        self.workers = workers
+        self.window = window if window is not None else workers * 4
+        self._buffer: list[str] = []
+        self._buffered = 0
+        self._pending_cr = False
+
+    def write(self, fragments: Iterable[str]) -> None:
+        """
+        Write fragments of text
+
+        :params fragments: text fragments in order
+        """
+        buffer = self._buffer
+        buffered = self._buffered
+        for fragment in fragments:
+            if fragment == "":
+                continue
+            if self._pending_cr:
+                self._pending_cr = False
+                if fragment[0] != "\n":
+                    buffer.append("\r")
+                    buffered += 1
+            if "\r" in fragment:
+                fragment = fragment.replace("\r\n", "\n")
+                if fragment[-1] == "\r":
+                    fragment = fragment[:-1]
+                    self._pending_cr = True
+            buffer.append(fragment)
+            buffered += len(fragment)
+            if buffered >= self.buffer_size:
+                self.f.write("".join(buffer))
+                buffer.clear()
+                buffered = 0
+        self._buffered = buffered
+
+    def flush(self) -> None:
+        """
+        Write buffered text to the file, including a held back `\\r`
+        """
+        if self._pending_cr:
+            self._buffer.append("\r")
+            self._pending_cr = False
+        if self._buffer:
+            self.f.write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def write_metadata(self, metadata: GameDataMetadata) -> None:
+        """
+        Write header of the book
+
+        :params metadata: game data metadata
+        """
+        self.write(_metadata_fragments(metadata))
+
+    def write_activity(self, activity: Activity, volume_type: ActivityType) -> None:
+        """
+        Write an activity section
+
+        :params activity: activity
+        :params volume_type: volume the activity is in
+        """
+        self.write(
+            _activities_fragments([activity], ACTIVITY_TYPE_LABEL[volume_type.value])
+        )
+
+    def write_operator(self, operator: Operator) -> None:
+        """
+        Write an operator section
+
+        :params operator: operator
+        """
+        self.write(_operator_fragments(operator))
+
+    def write_book(
+        self,
+        metadata: GameDataMetadata,
+        volumes: Mapping[ActivityType, Iterable[Activity]],
+        operators: Iterable[Operator],
+    ) -> None:
+        """
+        Write the whole book and flush, entities are consumed one at a time
+
+        :params metadata: game data metadata
+        :params volumes: activities of each type in `VOLUME_TYPES`, consumed in order
+        :params operators: operators
+        """
+        self.write_metadata(metadata)
+        if self.workers > 1:
+            for text in self._render_parallel(_iter_sections(volumes, operators)):
+                self.write((text,))
+        else:
+            for volume_type in VOLUME_TYPES:
+                for activity in volumes[volume_type]:
+                    self.write_activity(activity, volume_type)
+            for operator in operators:
+                self.write_operator(operator)
+        self.flush()
 
-    def _activities_content(activities: list[Activity], volume_title: str) -> str:
-        _result = ""
-        for activity in activities:
-            _result += f"『{volume_title}』{activity.name}\n"
-            for story in activity.stories:
-                _result += f"「{story.name}」{story.avg_tag}\n"
-                _result += story.description
-                for line in story.texts:
-                    if line.name != "":
-                        _result += f"【{line.name}】"
-                    _result += f"{line.text}\n"
-            _result += "\n"
-        return _result
-
-    result = ""
-
-    # metadata
-    result += "【游戏数据版本】" + data.metadata.version + "\n"
-    result += "【游戏数据日期】" + data.metadata.date + "\n"
-    result += "【文件生成日期】" + datetime.now().strftime("%Y-%m-%d") + "\n"
-    result += "\n"
-
-    volumes: dict[str, list[Activity]] = {
-        ActivityType.MAIN_STORY.value: [],
-        ActivityType.ACTIVITY_STORY.value: [],
-        ActivityType.MINI_STORY.value: [],
+    def _render_parallel(self, sections: Iterable[_Section]) -> Iterator[str]:
+        """
+        Render sections on worker processes, keep order with a bounded window
+
+        :params sections: sections in output order, consumed as the window frees
+
+        :return: section texts in order
+        """
+        pending: deque[Future[str]] = deque()
+        with ProcessPoolExecutor(self.workers) as executor:
+            for section in sections:
+                pending.append(executor.submit(_render_section, section))
+                if len(pending) >= self.window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def write_data(self, data: GameDataForBook) -> None:
+        """
+        Write the whole book of read game data and flush
+
+        :params data: game data
+        """
+        self.write_book(data.metadata, _volumes(data.activities), data.operators)
+
+
+def _iter_sections(
+    volumes: Mapping[ActivityType, Iterable[Activity]],
+    operators: Iterable[Operator],
+) -> Iterator[_Section]:
+    for volume_type in VOLUME_TYPES:
+        for activity in volumes[volume_type]:
+            yield activity, ACTIVITY_TYPE_LABEL[volume_type.value]
+    for operator in operators:
+        yield operator, None
+
+
+def _volumes(activities: Iterable[Activity]) -> dict[ActivityType, list[Activity]]:
+    volumes: dict[ActivityType, list[Activity]] = {
+        volume_type: [] for volume_type in VOLUME_TYPES
     }
-    for activity in data.activities:
-        volumes[activity.activity_type.value].append(activity)
-
-    for volume_type, activities in volumes.items():
-        result += _activities_content(activities, ACTIVITY_TYPE_LABEL[volume_type])
-
-    for operator in data.operators:
-        result += f"『干员』{operator.name}\n"
-        result += f"{operator.profession.name} {operator.sub_profession}\n"
-        result += operator.usage + "\n"
-        result += operator.description + "\n"
-
-        if len(operator.operator_stories) > 0:
-            result += "「干员档案」\n"
-            for line in operator.operator_stories:
-                result += line.title + "\n"
-                result += line.text + "\n"
-
-        if operator.uniequips is not None and len(operator.uniequips) > 0:
-            result += "「模组」\n"
-            for uniequip in operator.uniequips:
-                result += (
-                    "【"
-                    + uniequip.name
-                    + "（"
-                    + uniequip.type_name_1
-                    + (
-                        ("-" + uniequip.type_name_2)
-                        if uniequip.type_name_2 is not None
-                        else ""
-                    )
-                    + "）】\n"
-                )
-                result += uniequip.description + "\n"
+    for activity in activities:
+        volumes[activity.activity_type].append(activity)
+    return volumes
+
+
+def render_metadata(
+    metadata: GameDataMetadata, generated_date: str | None = None
+) -> str:
+    """
+    Render header of the book, with `\\r\\n` normalized
+
+    :params metadata: game data metadata
+    :params generated_date: date the file is generated, today if None
+
+    :return: header text
+    """
+    return "".join(_metadata_fragments(metadata, generated_date)).replace("\r\n", "\n")
+
+
+def render_activity(activity: Activity, volume_type: ActivityType) -> str:
+    """
+    Render an activity section, with `\\r\\n` normalized
+
+    :params activity: activity
+    :params volume_type: volume the activity is in
+
+    :return: section text
+    """
+    return _activities_content(
+        [activity], ACTIVITY_TYPE_LABEL[volume_type.value]
+    ).replace("\r\n", "\n")
 
-        if len(operator.voices) > 0:
-            result += "语音记录\n"
-            for voice in operator.voices:
-                result += "【" + voice.title + "】" + voice.text + "\n"
 
-        if len(operator.avgs) > 0:
-            result += "「干员密录」\n"
-            result += _activities_content(operator.avgs, "干员密录")
+def render_operator(operator: Operator) -> str:
+    """
+    Render an operator section, with `\\r\\n` normalized
+
+    :params operator: operator
+
+    :return: section text
+    """
+    return _operator_content(operator).replace("\r\n", "\n")
+
+
+def iter_txt(
+    metadata: GameDataMetadata,
+    volumes: Mapping[ActivityType, Iterable[Activity]],
+    operators: Iterable[Operator],
+) -> Iterator[str]:
+    """
+    Generate txt content section by section, with `\\r\\n` normalized
+
+    :params metadata: game data metadata
+    :params volumes: activities of each type in `VOLUME_TYPES`, consumed in order
+    :params operators: operators
+
+    :return: txt content of each activity and operator
+    """
+    yield render_metadata(metadata)
+
+    for volume_type in VOLUME_TYPES:
+        for activity in volumes[volume_type]:
+            yield render_activity(activity, volume_type)
 
-    return result.replace("\r\n", "\n")
+    for operator in operators:
+        yield render_operator(operator)
+
+
+def generate_txt(data: GameDataForBook) -> str:
+    """
+    Generate txt content from game data
+
+    :params data: game data
+
+    :return: txt content
+    """
+    return "".join(iter_txt(data.metadata, _volumes(data.activities), data.operators))
 
 
 __all__ = [
+    "VOLUME_TYPES",
+    "TxtWriter",
     "generate_txt",
+    "iter_txt",
+    "render_activity",
+    "render_metadata",
+    "render_operator",
 ]
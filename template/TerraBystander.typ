@@ -1,6 +1,7 @@
 // config
 #let nickname = "博士"
 #let data_path = "data.json"
+#let data_format = "json"
 #let skin_path = ""
 
 // read from input
@@ -8,6 +9,10 @@
   if "nickname" in sys.inputs {
     nickname = sys.inputs.nickname
   }
+  if "format" in sys.inputs {
+    data_format = sys.inputs.format
+    data_path = "data." + data_format
+  }
   if "data" in sys.inputs {
     data_path = sys.inputs.data
   }
@@ -105,7 +110,11 @@
 )
 
 // data
-#let data = json(data_path)
+#let data = if data_format == "cbor" {
+  cbor(data_path)
+} else {
+  json(data_path)
+}
 #let side_stories = ()
 #let main_stories = ()
 #let mini_stories = ()
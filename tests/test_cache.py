@@ -0,0 +1,83 @@
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from terra_bystander.gamedata import (
+    ActorLine,
+    GitStorage,
+    StoryCache,
+    StoryText,
+    TableCache,
+)
+from terra_bystander.gamedata.storage import ROOT_MARKER
+
+# `[name=12]` and `[name=]` lines give names that are not strings
+LINES = [
+    ActorLine("阿米娅", "博士。"),
+    ActorLine(12, "number name"),
+    ActorLine(None, "empty name"),
+    ActorLine(True, "bool name"),
+    ActorLine(1.5, "float name"),
+    ActorLine("", "narration"),
+    ActorLine("阿米娅", "again"),
+]
+
+
+def test_story_cache_round_trip(tmp_path: Path) -> None:
+    key = StoryCache.key(b"raw story")
+    StoryCache(tmp_path).put(key, LINES)
+
+    # a new instance reads from disk like the next run
+    lines = StoryCache(tmp_path).get(key)
+    assert lines == LINES
+    assert [type(line.name) for line in lines] == [type(line.name) for line in LINES]
+    assert StoryText(lines) == LINES
+
+
+def test_story_cache_miss(tmp_path: Path) -> None:
+    assert StoryCache(tmp_path).get(StoryCache.key(b"missing")) is None
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(repo), *args], check=True, capture_output=True
+    ).stdout.decode()
+
+
+def _commit(repo: Path, table: dict[str, str]) -> None:
+    (repo / ROOT_MARKER).parent.mkdir(parents=True, exist_ok=True)
+    (repo / ROOT_MARKER).write_text(json.dumps(table), encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "t")
+
+
+def test_table_cache_git_blob_id(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _commit(repo, {"a": "1"})
+
+    cache_path = tmp_path / "cache"
+    storage = GitStorage(repo / ".git")
+    cache = TableCache(cache_path)
+    assert cache.load(storage, ROOT_MARKER, json.loads) == {"a": "1"}
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # a warm start neither reads nor hashes the blob
+    def fail(path: str) -> bytes:
+        raise AssertionError(f"read {path}")
+
+    storage = GitStorage(repo / ".git")
+    monkeypatch.setattr(storage, "read_bytes", fail)
+    cache = TableCache(cache_path)
+    assert cache.load(storage, ROOT_MARKER, json.loads) == {"a": "1"}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    _commit(repo, {"a": "2"})
+    cache = TableCache(cache_path)
+    assert cache.load(GitStorage(repo / ".git"), ROOT_MARKER, json.loads) == {"a": "2"}
+    assert (cache.hits, cache.misses) == (0, 1)
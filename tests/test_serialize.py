@@ -0,0 +1,118 @@
+import io
+import json
+from typing import Any
+
+import pytest
+
+from terra_bystander.gamedata import (
+    Activity,
+    ActivityType,
+    ActorLine,
+    AvgStory,
+    EntryType,
+    GameDataForBook,
+    GameDataMetadata,
+    JsonSerializer,
+    Operator,
+    OperatorStory,
+    Power,
+    Profession,
+    ScriptJsonEncoder,
+    StoryText,
+    Voice,
+)
+from terra_bystander.gamedata.model import UniEquip
+from terra_bystander.gamedata.serialize import JSON_BACKENDS, _load_backend
+
+# escapes, non-BMP and separators json leaves unescaped
+TEXT = 'a "quoted" \\ / \x00\x1f\x7f\b\f\n\r\t 中文 😀  '
+
+LINES = [
+    ActorLine("阿米娅", TEXT),
+    ActorLine("", "narration"),
+    ActorLine(12, "number name"),
+    ActorLine(None, "empty name"),
+    ActorLine(True, "bool name"),
+    ActorLine("阿米娅", "again"),
+]
+
+
+def _activity(texts: Any) -> Activity:
+    return Activity(
+        id="act1",
+        name=TEXT,
+        secondary_name="",
+        entry_type=EntryType.ACTIVITY,
+        activity_type=ActivityType.ACTIVITY_STORY,
+        stories=[
+            AvgStory("s1", "name", "", "1-1", "BEG", TEXT, "info", texts),
+            AvgStory("s2", "name", "", "1-2", "END", "", "", StoryText()),
+        ],
+    )
+
+
+def _data() -> GameDataForBook:
+    operator = Operator(
+        id="char_002_amiya",
+        name="阿米娅",
+        appellation="Amiya",
+        usage=TEXT,
+        description="",
+        profession=Profession.CASTER,
+        sub_profession="corecaster",
+        operator_stories=[OperatorStory("档案", TEXT)],
+        voices=[Voice("任命助理", TEXT)],
+        avgs=[_activity(list(LINES))],
+        main_power=Power("rhodes", None, None),
+        sub_powers=[Power(team="elite")],
+        uniequips=[UniEquip("uniequip_001", "ORIGINAL", None, "证章", TEXT)],
+    )
+    minimal = Operator(
+        "char_x", "x", "", "", "", Profession.TANK, "", [], [], [], Power()
+    )
+    return GameDataForBook(
+        metadata=GameDataMetadata("1.0.0", "2024/01/02"),
+        activities=[_activity(StoryText(LINES)), _activity(list(LINES))],
+        operators=[operator, minimal],
+    )
+
+
+def _stdlib(o: Any, minify: bool) -> str:
+    separators = (",", ":") if minify else (", ", ": ")
+    return json.dumps(
+        o, ensure_ascii=False, cls=ScriptJsonEncoder, separators=separators
+    )
+
+
+@pytest.mark.parametrize("minify", [False, True])
+def test_walker_matches_stdlib(minify: bool) -> None:
+    serializer = JsonSerializer(minify)
+    # force the walker even if a backend is installed
+    serializer._backend = None
+    data = _data()
+    for entity in [data.metadata, *data.activities, *data.operators]:
+        assert serializer.dumps(entity) == _stdlib(entity, minify)
+
+    f = io.StringIO()
+    serializer.dump(data, f)
+    assert f.getvalue() == _stdlib(data, minify)
+
+
+@pytest.mark.parametrize("backend", JSON_BACKENDS)
+def test_backend_matches_stdlib(backend: str) -> None:
+    pytest.importorskip(backend)
+    serializer = JsonSerializer(minify=True)
+    serializer._backend = _load_backend([backend])
+    assert serializer._backend is not None
+
+    data = _data()
+    for entity in [data.metadata, *data.activities, *data.operators]:
+        assert serializer.dumps(entity).encode() == _stdlib(entity, True).encode()
+
+    f = io.StringIO()
+    serializer.dump(data, f)
+    assert f.getvalue().encode() == _stdlib(data, True).encode()
+
+
+def test_default_output_does_not_use_backend() -> None:
+    assert JsonSerializer()._backend is None
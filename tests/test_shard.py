@@ -0,0 +1,64 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from terra_bystander import txt
+from terra_bystander.gamedata import (
+    Activity,
+    ActivityType,
+    EntryType,
+    GameDataMetadata,
+)
+from terra_bystander.shard import ShardWriter, iter_txt_shards
+
+METADATA = GameDataMetadata("1.0.0", "2024/01/02")
+
+
+def _volumes(name: str) -> dict[ActivityType, list[Activity]]:
+    activity = Activity(
+        "act1", name, "", EntryType.ACTIVITY, ActivityType.ACTIVITY_STORY, []
+    )
+    volumes: dict[ActivityType, list[Activity]] = {t: [] for t in txt.VOLUME_TYPES}
+    volumes[ActivityType.ACTIVITY_STORY].append(activity)
+    return volumes
+
+
+def _write(path: Path, name: str, day: int, monkeypatch: pytest.MonkeyPatch):
+    class Date(datetime):
+        @classmethod
+        def now(cls, tz=None):  # type: ignore[override]
+            return datetime(2024, 1, day)
+
+    monkeypatch.setattr(txt, "datetime", Date)
+    writer = ShardWriter(path, "txt")
+    writer.write(iter_txt_shards(METADATA, _volumes(name), []))
+    return writer
+
+
+def _assert_manifest_matches_files(path: Path) -> None:
+    manifest = json.loads((path / ShardWriter.MANIFEST_NAME).read_text("utf-8"))
+    for entry in manifest["shards"]:
+        data = (path / entry["path"]).read_bytes()
+        assert hashlib.sha256(data).hexdigest() == entry["sha256"]
+        assert len(data) == entry["size"]
+
+
+def test_generation_date_does_not_rewrite(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    writer = _write(tmp_path, "活动", 1, monkeypatch)
+    assert (writer.written, writer.unchanged) == (2, 0)
+
+    # next day, same book
+    writer = _write(tmp_path, "活动", 2, monkeypatch)
+    assert (writer.written, writer.unchanged, writer.removed) == (0, 2, 0)
+    assert "2024-01-01" in (tmp_path / "metadata.txt").read_text("utf-8")
+    _assert_manifest_matches_files(tmp_path)
+
+    # only the changed activity is rewritten, the header keeps its date
+    writer = _write(tmp_path, "新活动", 3, monkeypatch)
+    assert (writer.written, writer.unchanged) == (1, 1)
+    _assert_manifest_matches_files(tmp_path)
@@ -0,0 +1,73 @@
+import pickle
+import subprocess
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from terra_bystander.gamedata import GitStorage, TarStorage, open_storage
+from terra_bystander.gamedata.storage import ROOT_MARKER
+
+FILES = {
+    ROOT_MARKER: b"{}",
+    "story/obt/main/level_main_00-01_beg.txt": b'[name="A"]text',
+}
+
+
+def _write_tree(path: Path) -> Path:
+    for name, data in FILES.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(data)
+    return path
+
+
+def test_missing_path(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        open_storage(tmp_path / "missing")
+
+
+def test_revision_of_directory(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        open_storage(_write_tree(tmp_path), revision="v1")
+
+
+def test_tar_pickle_drops_files(tmp_path: Path) -> None:
+    tree = _write_tree(tmp_path / "tree")
+    archive = tmp_path / "gamedata.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(tree, arcname="zh_CN/gamedata")
+
+    storage = open_storage(archive)
+    assert isinstance(storage, TarStorage)
+    assert storage.read_bytes(ROOT_MARKER) == FILES[ROOT_MARKER]
+    data = pickle.dumps(storage)
+    assert FILES["story/obt/main/level_main_00-01_beg.txt"] not in data
+
+    copy = pickle.loads(data)
+    assert sorted(copy.names()) == sorted(FILES)
+
+
+def _git(git_dir: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(git_dir), *args], check=True, capture_output=True
+    ).stdout.decode()
+
+
+def test_git_missing_blob(tmp_path: Path) -> None:
+    repo = _write_tree(tmp_path)
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "t")
+
+    storage = open_storage(repo, revision="HEAD")
+    assert isinstance(storage, GitStorage)
+    assert storage.read_bytes(ROOT_MARKER) == FILES[ROOT_MARKER]
+
+    # like a partial clone without the blob
+    name = "story/obt/main/level_main_00-01_beg.txt"
+    object_id = _git(repo, "rev-parse", f"HEAD:{name}").strip()
+    (repo / ".git" / "objects" / object_id[:2] / object_id[2:]).unlink()
+    with pytest.raises(FileNotFoundError, match=object_id):
+        storage.read_bytes(name)
+    # the pipe stays usable
+    assert storage.read_bytes(ROOT_MARKER) == FILES[ROOT_MARKER]
@@ -0,0 +1,123 @@
+"""
+Differential test of the regex scanner against the reference state machine
+
+Set `TERRA_BYSTANDER_GAMEDATA` to a gamedata directory, archive or pack
+to also compare every code line of its story files.
+"""
+
+import os
+import re
+import sys
+from collections.abc import Iterator
+
+import pytest
+
+from terra_bystander.gamedata import open_storage
+from terra_bystander.script import Token, Tokenizer
+from terra_bystander.script.lexer import _NON_DECIMAL_DIGITS
+
+GAMEDATA_ENV = "TERRA_BYSTANDER_GAMEDATA"
+
+EDGE_CASE_LINES = [
+    '[Dialog(head="char_002_amiya", delay=0.5, fadetime=1)]',
+    '[name="阿米娅"]博士，您醒了？',
+    "[Background(image=bg_black, isBlock=true)]",
+    "[Blocker(a=1, r=0,g=0, b=0, fadetime=2, block=true)]",
+    "[ Delay ( time = 1 ) ]",
+    '[HEADER(key="title_test", is_skippable=true)] 标题',
+    "[Character]",
+    "[]",
+    "[[nested]]",
+    # unfinished token, kept as actor text
+    "[Delay(time=1)] tail",
+    "[name=",
+    "[Delay(time",
+    "[Delay(time=1",
+    "[Dialog",
+    "plain text without brackets",
+    # unterminated string, takes the rest of the line
+    '[name="阿米娅',
+    '[Dialog(text="a, b)] c',
+    '[name=""]',
+    '[name="a\\"b"]',
+    # non-ascii digits
+    "[Delay(time=١٢)]",
+    "[Delay(time=²)]",
+    "[Delay(time=1²)]",
+    "[Delay(time=٣.٥)]",
+    "[Delay(time=१२३abc)]",
+    "[Delay(time=⑤)]",
+    "[Delay(time=𐹠𐹡)]",
+    "[name=¹abc]",
+    # double decimal point
+    "[Delay(time=1.2.3)]",
+    "[Delay(time=1..2)]",
+    "[Delay(time=.5)]",
+    "[Delay(time=5.)]",
+    "[Delay(time=-1.5)]",
+    "",
+    " ",
+    "\t[Delay(time=1)]\t",
+]
+
+
+def test_non_decimal_digits() -> None:
+    # the precomputed class must match `str.isdigit` of this Python
+    digit_class = re.compile(f"[{_NON_DECIMAL_DIGITS}]")
+    expected = [
+        c
+        for c in map(chr, range(sys.maxunicode + 1))
+        if c.isdigit() and not c.isdecimal()
+    ]
+    actual = [
+        c for c in map(chr, range(sys.maxunicode + 1)) if digit_class.fullmatch(c)
+    ]
+    assert actual == expected
+
+
+def _outcome(
+    line: str, reference: bool
+) -> tuple[list[Token] | None, str | None, int | None]:
+    try:
+        return Tokenizer.tokenize(line, reference=reference), None, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", getattr(e, "offset", None)
+
+
+def _assert_same(line: str) -> None:
+    assert _outcome(line, False) == _outcome(line, True), repr(line)
+
+
+@pytest.mark.parametrize("line", EDGE_CASE_LINES)
+def test_edge_cases(line: str) -> None:
+    _assert_same(line)
+
+
+def _gamedata_lines(path: str) -> Iterator[str]:
+    storage = open_storage(path)
+    for name in sorted(storage.names()):
+        if name.startswith("story/") and name.endswith(".txt"):
+            for line in Tokenizer.iter_code_lines(storage.read_bytes(name)):
+                yield line.text
+
+
+@pytest.mark.skipif(GAMEDATA_ENV not in os.environ, reason=f"{GAMEDATA_ENV} is not set")
+def test_gamedata_lines() -> None:
+    count = 0
+    for line in _gamedata_lines(os.environ[GAMEDATA_ENV]):
+        _assert_same(line)
+        count += 1
+    assert count > 0, "no story lines found"
+
+
+def test_error_location_after_continuation() -> None:
+    source = "[Dialog]\n[Delay(\\\n  time=1.2.3)]\n"
+    with pytest.raises(SyntaxError) as info:
+        for _ in Tokenizer.iter_tokens(source, "story.txt"):
+            pass
+    # the second `.` on the third physical line
+    assert (info.value.filename, info.value.lineno, info.value.offset) == (
+        "story.txt",
+        3,
+        11,
+    )